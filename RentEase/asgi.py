@@ -2,6 +2,9 @@
 ASGI config for RentEase project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server (e.g. ``uvicorn RentEase.asgi:application``) so the
+notification stream can hold its connections open; under WSGI the stream
+answers 204 and the pages fall back to polling.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -19,6 +19,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Offer photo bytes: 'database' (bytea column) or 'filesystem' (content-addressed files under PHOTO_STORAGE_ROOT)
+PHOTO_STORAGE_BACKEND = os.environ.get('PHOTO_STORAGE_BACKEND', 'database')
+PHOTO_STORAGE_ROOT = os.environ.get('PHOTO_STORAGE_ROOT', str(BASE_DIR / 'photo_store'))
+
+# Rendered contract PDFs, one directory per contract, files named by the hash of what they show
+CONTRACT_PDF_CACHE_ROOT = os.environ.get('CONTRACT_PDF_CACHE_ROOT', str(BASE_DIR / 'pdf_cache'))
+
+# Who renders PDFs: 'worker' (the run_pdf_worker command) or 'inline' (the requesting process).
+# Inline by default under DEBUG, so runserver works without a worker running.
+PDF_RENDER_EXECUTOR = os.environ.get(
+    'PDF_RENDER_EXECUTOR', 'inline' if os.environ.get('DEBUG', 'True') == 'True' else 'worker'
+)
+# Seconds after which a job still marked running is assumed lost and rendered again
+PDF_JOB_TIMEOUT = int(os.environ.get('PDF_JOB_TIMEOUT', '300'))
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -41,12 +56,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'RentEaseApp'
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'RentEaseApp.accounts.CurrentUserMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -89,6 +106,45 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory in development. In production point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. django.core.cache.backends.redis.RedisCache, redis://host:6379/0) so every
+# worker sees the same cached listings and invalidations.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'rentease'),
+    }
+}
+
+# Notification push events: 'postgres' (LISTEN/NOTIFY, shared by all worker processes)
+# or 'memory' (single process only, e.g. tests)
+NOTIFICATION_BROKER = os.environ.get('NOTIFICATION_BROKER', 'postgres')
+
+# Seconds a rendered anonymous offer listing page stays cached (changes invalidate it earlier)
+OFFER_LISTING_CACHE_TIMEOUT = int(os.environ.get('OFFER_LISTING_CACHE_TIMEOUT', '300'))
+
+# Seconds a logged-in landlord/tenant row stays cached (saving the user invalidates it earlier)
+ACCOUNT_CACHE_TIMEOUT = int(os.environ.get('ACCOUNT_CACHE_TIMEOUT', '300'))
+
+# Seconds a contract template preview (and the template version it was built from) stays cached
+CONTRACT_PREVIEW_CACHE_TIMEOUT = int(os.environ.get('CONTRACT_PREVIEW_CACHE_TIMEOUT', '3600'))
+
+
+# PBKDF2 cost of password hashes; size it to the login servers' peak login rate
+# (python manage.py benchmark_login). Existing hashes are upgraded on next login.
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', '1000000'))
+
+PASSWORD_HASHERS = [
+    'RentEaseApp.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,114 @@
+"""
+Resolution of the logged-in landlord or tenant.
+
+The session only stores landlord_id / tenant_id. CurrentUserMiddleware gives
+every request a CurrentUser that loads each side lazily and at most once, so
+views, decorators and helpers can all ask for the user without repeating the
+lookup. Loaded rows are also kept in the cache for ACCOUNT_CACHE_TIMEOUT
+seconds; saving or deleting a user drops the entry (see signals.py).
+
+authenticate() checks login credentials against the Account view, which
+covers both user tables in a single lookup.
+"""
+from functools import cached_property
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+
+from .models import Account, LandlordUser, TenantUser
+
+ACCOUNT_MODELS = {
+    'landlord': LandlordUser,
+    'tenant': TenantUser,
+}
+
+
+def account_cache_key(user_type, user_id):
+    return f'account:{user_type}:{user_id}'
+
+
+def load_account(user_type, user_id):
+    """The landlord/tenant with `user_id`, from the cache when possible; None if it does not exist."""
+    if not user_id:
+        return None
+    key = account_cache_key(user_type, user_id)
+    user = cache.get(key)
+    if user is None:
+        try:
+            # The password hash is never needed by a logged-in page, so it stays out of the cache.
+            user = ACCOUNT_MODELS[user_type].objects.defer('password').get(id=user_id)
+        except ACCOUNT_MODELS[user_type].DoesNotExist:
+            return None
+        cache.set(key, user, settings.ACCOUNT_CACHE_TIMEOUT)
+    return user
+
+
+def forget_account(user_type, user_id):
+    cache.delete(account_cache_key(user_type, user_id))
+
+
+def authenticate(email, password):
+    """
+    The Account matching `email` and `password`, or None.
+
+    A landlord wins over a tenant registered with the same email, as it always
+    has. Hashes made with outdated hasher settings are upgraded in place.
+    """
+    account = Account.objects.filter(email=email).order_by('user_type').first()
+    if account is None:
+        return None
+
+    def upgrade(raw_password):
+        ACCOUNT_MODELS[account.user_type].objects.filter(id=account.user_id).update(
+            password=make_password(raw_password)
+        )
+
+    if not check_password(password, account.password, setter=upgrade):
+        return None
+    return account
+
+
+class CurrentUser:
+    """The landlord and tenant of one request, each loaded on first access."""
+
+    def __init__(self, session):
+        self.session = session
+
+    @cached_property
+    def landlord(self):
+        return load_account('landlord', self.session.get('landlord_id'))
+
+    @cached_property
+    def tenant(self):
+        return load_account('tenant', self.session.get('tenant_id'))
+
+
+def current_user(request):
+    """The request's CurrentUser (created here for requests that skipped the middleware)."""
+    try:
+        return request.current_user
+    except AttributeError:
+        request.current_user = CurrentUser(request.session)
+        return request.current_user
+
+
+def get_logged_in_landlord(request):
+    """Helper function to get the logged-in landlord user from session"""
+    return current_user(request).landlord
+
+
+def get_logged_in_tenant(request):
+    """Helper function to get the logged-in tenant user from session"""
+    return current_user(request).tenant
+
+
+class CurrentUserMiddleware:
+    """Attach a lazily resolved request.current_user; must come after SessionMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.current_user = CurrentUser(request.session)
+        return self.get_response(request)
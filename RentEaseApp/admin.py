@@ -5,7 +5,19 @@ from .models import TenantUser
 from .models import LandlordUser
 
 admin.site.register(Offer)
-admin.site.register(Photo)
 admin.site.register(TenantUser)
 admin.site.register(LandlordUser)
+
+
+@admin.register(Photo)
+class PhotoAdmin(admin.ModelAdmin):
+    """Photo admin that never loads image payloads (legacy photo_data is deferred by the manager)."""
+    list_display = ('id', 'offer', 'content_type', 'blob', 'created_at')
+    list_select_related = ('offer', 'blob')
+    raw_id_fields = ('offer', 'blob')
+    exclude = ('photo_data',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('blob__data')
+
 # Register your models here.
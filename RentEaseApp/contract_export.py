@@ -0,0 +1,98 @@
+"""
+Bulk export of contract PDFs as a streamed ZIP archive.
+
+contract_archive() yields the archive in pieces as it is written, so a
+response built on it holds one file chunk in memory, however many contracts
+it contains. PDFs come from the rendered-file cache; missing ones are all
+queued up front (see pdf_jobs.request_pdf) so the worker pool renders them
+in parallel while the cached ones are already being sent.
+"""
+import time
+import zipfile
+
+from .models import PdfRenderJob
+from .pdf import cached_pdf_path, contract_pdf_filename, contract_pdf_inputs, contract_pdf_key
+from .pdf_jobs import request_pdf, wait_for_job
+
+CHUNK_SIZE = 64 * 1024
+# Longest silence while waiting on one entry: proxies and clients give up on a
+# response that sends nothing for long.
+EXPORT_JOB_WAIT = 5
+
+
+class _ZipStream:
+    """Write-only file for ZipFile that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def contract_archive(contracts):
+    """
+    Yield a ZIP of the contracts' PDFs (offer, tenant, landlord and template loaded).
+
+    Contracts whose PDF fails to render, or is still being rendered after
+    EXPORT_JOB_WAIT seconds, are listed in an errors.txt entry instead of
+    failing the whole download.
+    """
+    ready, waiting = [], []
+    for contract in contracts:
+        inputs = contract_pdf_inputs(contract)
+        key = contract_pdf_key(inputs)
+        job = request_pdf(contract.id, inputs, key)
+        if job is None or job.status == PdfRenderJob.DONE:
+            ready.append((contract, key))
+        else:
+            waiting.append((contract, key, job))
+
+    stream = _ZipStream()
+    # An unseekable output makes ZipFile write each entry's sizes after its data.
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        errors = []
+
+        def add_pdf(contract, key):
+            path = cached_pdf_path(contract.id, key)
+            if path is None:
+                # Discarded meanwhile (the contract was signed while we streamed).
+                errors.append(f'{contract_pdf_filename(contract)}: changed during export, download it again')
+                return
+            with open(path, 'rb') as pdf, archive.open(contract_pdf_filename(contract), 'w') as entry:
+                while chunk := pdf.read(CHUNK_SIZE):
+                    entry.write(chunk)
+                    # The compressor may hold a chunk back; nothing to send yet then.
+                    if data := stream.drain():
+                        yield data
+
+        for contract, key in ready:
+            yield from add_pdf(contract, key)
+
+        patient = True
+        for contract, key, job in waiting:
+            if patient:
+                job = wait_for_job(job, time.monotonic() + EXPORT_JOB_WAIT)
+            else:
+                job.refresh_from_db(fields=['status', 'error'])
+            if job.status == PdfRenderJob.DONE:
+                yield from add_pdf(contract, key)
+            elif job.status == PdfRenderJob.FAILED:
+                errors.append(f'{contract_pdf_filename(contract)}: {job.error}')
+            else:
+                # The workers are behind: take what is ready now rather than keep the response silent.
+                patient = False
+                errors.append(f'{contract_pdf_filename(contract)}: still being rendered, export it again in a moment')
+
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield stream.drain()
@@ -0,0 +1,192 @@
+"""
+Compiled contract templates.
+
+A ContractTemplate is parsed once into a flat list of literal text and
+placeholder slots; rendering resolves each distinct placeholder once and
+joins the list. Compiled forms are cached per template and recompiled when
+its updated_at changes.
+
+Two placeholder sources exist, as before:
+
+- template_structure: "text" items are literal, "block" items name a field
+  (or one of the LABEL_FIELDS labels);
+- template_content: free text with {{field}} placeholders plus the
+  **Label** / {{Label}} forms of CONTENT_LABEL_FIELDS.
+"""
+
+
+def format_price(value):
+    """Format number with space as thousands separator (e.g. 3255 -> '3 255')."""
+    if value is None:
+        return ''
+    try:
+        n = int(value)
+        return f'{n:,}'.replace(',', ' ')
+    except (ValueError, TypeError):
+        return str(value) if value else ''
+
+
+TENANT_NAME_PESEL = 'Tenant Name PESEL'
+
+PLACEHOLDER_RESOLVERS = {
+    'tenant_name': lambda offer, tenant, landlord: tenant.name or '',
+    'tenant_surname': lambda offer, tenant, landlord: tenant.surname or '',
+    'tenant_full_name': lambda offer, tenant, landlord: f"{tenant.name} {tenant.surname}",
+    'tenant_pesel': lambda offer, tenant, landlord: tenant.pesel or '',
+    'tenant_id_card': lambda offer, tenant, landlord: tenant.id_card_number or '',
+    'tenant_address': lambda offer, tenant, landlord: tenant.get_full_address() or '',
+    'tenant_phone': lambda offer, tenant, landlord: tenant.phone_number or '',
+    'tenant_email': lambda offer, tenant, landlord: tenant.email or '',
+    'tenant_bank_account': lambda offer, tenant, landlord: tenant.bank_account_number or '',
+
+    'landlord_name': lambda offer, tenant, landlord: landlord.name or '',
+    'landlord_surname': lambda offer, tenant, landlord: landlord.surname or '',
+    'landlord_full_name': lambda offer, tenant, landlord: f"{landlord.name} {landlord.surname}",
+    'landlord_pesel': lambda offer, tenant, landlord: landlord.pesel or '',
+    'landlord_id_card': lambda offer, tenant, landlord: landlord.id_card_number or '',
+    'landlord_address': lambda offer, tenant, landlord: landlord.get_full_address() or '',
+    'landlord_phone': lambda offer, tenant, landlord: landlord.phone_number or '',
+    'landlord_email': lambda offer, tenant, landlord: landlord.email or '',
+    'landlord_bank_account': lambda offer, tenant, landlord: landlord.bank_account_number or '',
+
+    'property_title': lambda offer, tenant, landlord: offer.title or '',
+    'property_location': lambda offer, tenant, landlord: offer.location or '',
+    'property_price': lambda offer, tenant, landlord: format_price(offer.price),
+    'property_area': lambda offer, tenant, landlord: str(offer.area) if offer.area else '',
+    'property_rooms': lambda offer, tenant, landlord: str(offer.number_of_rooms) if offer.number_of_rooms else '',
+    'property_floor': lambda offer, tenant, landlord: offer.floor or '',
+    'property_description': lambda offer, tenant, landlord: offer.body or '',
+
+    TENANT_NAME_PESEL: lambda offer, tenant, landlord: (
+        f"{tenant.name or ''} {tenant.surname or ''} {tenant.pesel or ''}".strip()
+    ),
+}
+
+# Labels usable in template_content, as **Label** or {{Label}}.
+CONTENT_LABEL_FIELDS = {
+    'Email': 'landlord_email', 'Phone': 'landlord_phone', 'Bank Account': 'landlord_bank_account',
+    'Location': 'property_location', 'Area': 'property_area', 'Rooms': 'property_rooms',
+    'Floor': 'property_floor', 'Price': 'property_price', TENANT_NAME_PESEL: TENANT_NAME_PESEL,
+}
+
+# Labels usable as block field names in template_structure.
+LABEL_FIELDS = {
+    **CONTENT_LABEL_FIELDS,
+    'Description': 'property_description', 'Property Title': 'property_title',
+}
+
+# (placeholder, resolver key) pairs of template_content. Where two placeholders overlap
+# (e.g. "**Area**Email**") the one listed first wins, as in the replace() chain this
+# replaced, so existing templates keep rendering exactly as before.
+CONTENT_PLACEHOLDERS = [
+    *((f'{{{{{field}}}}}', field) for field in PLACEHOLDER_RESOLVERS if field != TENANT_NAME_PESEL),
+    *((f'**{label}**', CONTENT_LABEL_FIELDS[label]) for label in ('Email', 'Phone', 'Bank Account')),
+    *((f'{{{{{label}}}}}', CONTENT_LABEL_FIELDS[label]) for label in ('Email', 'Phone', 'Bank Account')),
+    (f'**{TENANT_NAME_PESEL}**', TENANT_NAME_PESEL),
+    (f'{{{{{TENANT_NAME_PESEL}}}}}', TENANT_NAME_PESEL),
+    *((f'**{label}**', CONTENT_LABEL_FIELDS[label]) for label in ('Location', 'Area', 'Rooms', 'Floor', 'Price')),
+    *((f'{{{{{label}}}}}', CONTENT_LABEL_FIELDS[label]) for label in ('Location', 'Area', 'Rooms', 'Floor', 'Price')),
+]
+
+
+def placeholder_field(field_name):
+    """Resolver key for a block field name or label, or None if nothing fills it."""
+    field_name = LABEL_FIELDS.get(field_name, field_name)
+    return field_name if field_name in PLACEHOLDER_RESOLVERS else None
+
+
+def get_placeholder_value(field_name, offer, tenant, landlord):
+    """Get the actual value for a placeholder field"""
+    field = placeholder_field(field_name)
+    return PLACEHOLDER_RESOLVERS[field](offer, tenant, landlord) if field else ''
+
+
+class CompiledTemplate:
+    """Literal text with placeholder slots; render() fills the slots and joins once."""
+
+    def __init__(self, parts, slots):
+        self.parts = parts  # literal strings; slot positions hold None
+        self.slots = slots  # [(position, resolver key)]
+        self.fields = {field for _, field in slots}
+
+    def render(self, offer, tenant, landlord):
+        return self.fill({field: PLACEHOLDER_RESOLVERS[field](offer, tenant, landlord) for field in self.fields})
+
+    def fill(self, values):
+        """Join the literal parts with values[key] in each slot."""
+        parts = self.parts.copy()
+        for position, field in self.slots:
+            parts[position] = values[field]
+        return ''.join(parts)
+
+
+def compile_structure(structure):
+    parts, slots = [], []
+    for item in structure:
+        if item.get('type') == 'text':
+            parts.append(item.get('content', ''))
+        elif item.get('type') == 'block':
+            field = placeholder_field(item.get('field_name', ''))
+            if field:
+                slots.append((len(parts), field))
+                parts.append(None)
+            else:
+                parts.append('')
+    return CompiledTemplate(parts, slots)
+
+
+def compile_placeholders(content, placeholders):
+    """
+    Compile free text given (placeholder, slot key) pairs. Where two placeholders
+    overlap, the one listed first wins.
+    """
+    # Literal pieces are split on each placeholder in order; slots are represented
+    # by their key until the final list is built.
+    pieces = [(content, None)]
+    for placeholder, field in placeholders:
+        split = []
+        for text, slot in pieces:
+            if slot is not None or placeholder not in text:
+                split.append((text, slot))
+                continue
+            for i, literal in enumerate(text.split(placeholder)):
+                if i:
+                    split.append((None, field))
+                split.append((literal, None))
+        pieces = split
+    parts, slots = [], []
+    for text, slot in pieces:
+        if slot is not None:
+            slots.append((len(parts), slot))
+        parts.append(text)
+    return CompiledTemplate(parts, slots)
+
+
+def compile_content(content):
+    return compile_placeholders(content, CONTENT_PLACEHOLDERS)
+
+
+def compile_template(template):
+    if template.template_structure:
+        return compile_structure(template.template_structure)
+    return compile_content(template.template_content)
+
+
+# template id -> (updated_at, CompiledTemplate); an edit replaces the entry.
+_compiled_templates = {}
+
+
+def compiled_template(template):
+    """The compiled form of a ContractTemplate, compiled at most once per version."""
+    if template.pk is None:
+        return compile_template(template)
+    cached = _compiled_templates.get(template.pk)
+    if cached is None or cached[0] != template.updated_at:
+        cached = (template.updated_at, compile_template(template))
+        _compiled_templates[template.pk] = cached
+    return cached[1]
+
+
+def generate_contract_from_template(template, offer, tenant, landlord):
+    """Generate a contract instance from a template by replacing placeholders"""
+    return compiled_template(template).render(offer, tenant, landlord)
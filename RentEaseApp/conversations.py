@@ -0,0 +1,72 @@
+"""
+Bulk maintenance of the denormalized Conversation columns.
+
+Day-to-day the counters are kept current by Conversation.add_message() and
+Conversation.mark_read(); this rebuilds them from the Message table (after
+a backfill, a manual data fix, or to repair drift).
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+from .models import MESSAGE_PREVIEW_LENGTH
+
+
+def _update_in_batches(conversation_model, batch_size, **updates):
+    """Apply `updates` to every conversation, one committed UPDATE per batch of ids."""
+    processed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            conversation_model.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return processed
+        with transaction.atomic():
+            conversation_model.objects.filter(id__in=ids).update(**updates)
+        processed += len(ids)
+        last_id = ids[-1]
+
+
+def _message_aggregate(message_model, aggregate, **filters):
+    """Correlated subquery aggregating the messages of the outer conversation."""
+    values = (
+        message_model.objects.filter(conversation=OuterRef('pk'), **filters)
+        .order_by()
+        .values('conversation')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Subquery(values)
+
+
+def recompute_conversation_counters(conversation_model, message_model, batch_size=1000):
+    """
+    Recompute unread counters and last-message columns of every conversation.
+
+    Unread counts are derived from the read watermarks: messages from the other
+    side newer than the reader's last_read_by_* id. Returns the number of
+    conversations processed.
+    """
+    def unread(sender_type, watermark):
+        return Coalesce(
+            _message_aggregate(message_model, Count('id'), sender_type=sender_type, id__gt=OuterRef(watermark)),
+            Value(0),
+            output_field=IntegerField(),
+        )
+
+    latest = message_model.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    return _update_in_batches(
+        conversation_model, batch_size,
+        unread_for_landlord=unread('tenant', 'last_read_by_landlord'),
+        unread_for_tenant=unread('landlord', 'last_read_by_tenant'),
+        last_message_id=Coalesce(_message_aggregate(message_model, Max('id')), Value(0)),
+        last_message_at=Subquery(latest.values('created_at')[:1]),
+        last_message_preview=Coalesce(
+            Subquery(latest.annotate(preview=Substr('content', 1, MESSAGE_PREVIEW_LENGTH)).values('preview')[:1]),
+            Value('')
+        ),
+    )
+
@@ -0,0 +1,161 @@
+"""
+Publish/subscribe channel pushing notification events to open browser tabs.
+
+Every logged-in user has a channel ("landlord:12", "tenant:7"). Code that
+changes what a user's notification bell shows publishes a small event there;
+the notification stream view holds one subscription per open tab and pushes
+a fresh notification payload when an event arrives.
+
+Two brokers are available, chosen with settings.NOTIFICATION_BROKER:
+
+- 'memory': in-process fan-out. Only reaches subscribers of the same process,
+  so it suits tests and a single-process development server.
+- 'postgres': events go through Postgres NOTIFY and every process runs one
+  LISTEN connection that fans them out to its local subscribers, so any
+  number of workers share the same events.
+"""
+import asyncio
+import json
+import select
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import psycopg2
+from django.conf import settings
+from django.db import connection, transaction
+
+NOTIFY_CHANNEL = 'rentease_events'
+
+
+def user_channel(user_type, user_id):
+    return f"{user_type}:{user_id}"
+
+
+class Subscription:
+    """Events of one channel, consumed by a single coroutine."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def put(self, event):
+        """Thread-safe: may be called from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # The subscriber's event loop is already closed; nobody is listening.
+            pass
+
+    async def get(self, timeout):
+        """Next event, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InProcessBroker:
+    name = 'memory'
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, channel):
+        """Context manager yielding a Subscription; must be entered inside a running event loop."""
+        subscription = Subscription()
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+
+class PostgresBroker(InProcessBroker):
+    name = 'postgres'
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+
+    def publish(self, channel, event):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps({'channel': channel, 'event': event})])
+
+    @contextmanager
+    def subscribe(self, channel):
+        self._ensure_listener()
+        with super().subscribe(channel) as subscription:
+            yield subscription
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, name='notification-listener', daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except psycopg2.Error:
+                time.sleep(1)
+
+    def _listen(self):
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(
+            dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'], host=db['HOST'], port=db['PORT']
+        )
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    message = json.loads(conn.notifies.pop(0).payload)
+                    self.deliver(message['channel'], message['event'])
+        finally:
+            conn.close()
+
+
+NOTIFICATION_BROKERS = {
+    InProcessBroker.name: InProcessBroker,
+    PostgresBroker.name: PostgresBroker,
+}
+
+_brokers = {}
+
+
+def get_broker():
+    """The process-wide broker selected by settings.NOTIFICATION_BROKER."""
+    name = getattr(settings, 'NOTIFICATION_BROKER', PostgresBroker.name)
+    if name not in _brokers:
+        try:
+            _brokers[name] = NOTIFICATION_BROKERS[name]()
+        except KeyError:
+            raise ValueError(f"Unknown notification broker: {name!r}")
+    return _brokers[name]
+
+
+def publish_after_commit(user_type, user_id, event):
+    """Send `event` to a user's channel once the current transaction commits."""
+    transaction.on_commit(lambda: get_broker().publish(user_channel(user_type, user_id), event), robust=True)
@@ -0,0 +1,15 @@
+"""
+Password hasher whose cost is set per deployment.
+
+settings.PASSWORD_HASH_ITERATIONS sizes PBKDF2 to what the login servers can
+afford at their peak login rate. Hashes made with a different count stay
+valid and are re-hashed with the current one on the user's next login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS
@@ -0,0 +1,60 @@
+"""
+Image processing for offer photos (Pillow).
+
+Kept free of Django imports so render_variants() can run in worker
+processes (see the generate_photo_variants management command).
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Longest edge in pixels of each derivative size.
+VARIANT_SIZES = {
+    'card': 640,
+    'gallery': 1280,
+    'full': 2048,
+}
+
+# format name -> (Pillow format, MIME type, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Sizes listed in srcset for each display slot (first one is the fallback src).
+VARIANT_SRCSETS = {
+    'card': ('card', 'gallery'),
+    'gallery': ('gallery', 'full'),
+}
+
+
+def _load_rgb(content):
+    """Open image bytes, apply the EXIF orientation and flatten to RGB."""
+    image = Image.open(BytesIO(content))
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variants(content):
+    """
+    Render every size/format derivative of an image.
+
+    Returns a list of (size, format, width, height, bytes). Outputs carry no
+    EXIF metadata and never exceed the size's longest edge (no upscaling).
+    Raises OSError (or Image.DecompressionBombError) for unreadable images.
+    """
+    original = _load_rgb(content)
+    variants = []
+    for size, max_edge in VARIANT_SIZES.items():
+        image = original.copy()
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        for fmt, (pil_format, _, options) in VARIANT_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            variants.append((size, fmt, image.width, image.height, buffer.getvalue()))
+    return variants
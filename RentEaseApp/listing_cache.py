@@ -0,0 +1,50 @@
+"""
+Cache of offer listing results (rendered card pages and facet counts).
+
+Keys embed a listing version number. Saving or deleting an Offer or a Photo
+bumps the version (see signals.py), which makes every cached listing
+unreachable at once; stale entries then simply expire. Nothing else in the
+cache is touched.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+LISTING_VERSION_KEY = 'offer-listing:version'
+
+
+def listing_version():
+    """Current listing version, initialised on first use."""
+    version = cache.get(LISTING_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a version lost on eviction never reuses old keys.
+        cache.add(LISTING_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(LISTING_VERSION_KEY)
+    return version
+
+
+def bump_listing_version():
+    """Invalidate every cached listing."""
+    try:
+        cache.incr(LISTING_VERSION_KEY)
+    except ValueError:
+        listing_version()
+
+
+def listing_key(namespace, payload):
+    """Cache key for `payload` (any JSON-serializable value) under the current listing version."""
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{namespace}:{listing_version()}:{digest}'
+
+
+def cached_listing(namespace, payload, compute, timeout=None):
+    """Return the cached value for `payload`, calling `compute()` to fill it on a miss."""
+    key = listing_key(namespace, payload)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, settings.OFFER_LISTING_CACHE_TIMEOUT if timeout is None else timeout)
+    return value
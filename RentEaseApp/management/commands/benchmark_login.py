@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from RentEaseApp.accounts import authenticate
+from RentEaseApp.models import LandlordUser, TenantUser
+
+
+class Command(BaseCommand):
+    help = ('Measures login latency (lookup + password check) under concurrent logins, '
+            'using temporary accounts that are removed afterwards')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200,
+                            help='Total number of logins to perform')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Number of logins running at the same time')
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        suffix = uuid.uuid4().hex[:12]
+        hashed = make_password(password)
+        # One account of each type: tenant logins used to cost an extra lookup.
+        users = [
+            LandlordUser.objects.create(name='Benchmark', surname='Landlord', password=hashed,
+                                        email=f'benchmark-landlord-{suffix}@rentease.invalid'),
+            TenantUser.objects.create(name='Benchmark', surname='Tenant', password=hashed,
+                                      email=f'benchmark-tenant-{suffix}@rentease.invalid'),
+        ]
+        emails = [user.email for user in users]
+
+        def login(i):
+            started = time.perf_counter()
+            try:
+                if authenticate(emails[i % len(emails)], password) is None:
+                    raise RuntimeError('Benchmark login was rejected')
+                return time.perf_counter() - started
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+                timings = sorted(executor.map(login, range(options['logins'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            for user in users:
+                user.delete()
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+
+        self.stdout.write(f'PBKDF2 iterations: {settings.PASSWORD_HASH_ITERATIONS}')
+        self.stdout.write(
+            f'{len(timings)} logins, concurrency {options["concurrency"]}: '
+            f'{len(timings) / elapsed:.1f} logins/s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'p50 {statistics.median(timings) * 1000:.1f} ms, '
+            f'p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms, '
+            f'max {timings[-1] * 1000:.1f} ms'
+        ))
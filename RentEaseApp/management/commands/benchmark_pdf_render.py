@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from RentEaseApp.pdf import CONTRACT_PDF_LAYOUT, contract_pdf_renderer
+from RentEaseApp.pdf_render import ContractPdfRenderer
+
+SAMPLE_PARAGRAPH = (
+    'Najemca zobowiązuje się do terminowego regulowania czynszu oraz opłat eksploatacyjnych, '
+    'a Wynajmujący do utrzymania lokalu w stanie przydatnym do umówionego użytku.'
+)
+
+
+class Command(BaseCommand):
+    help = ('Measures contract PDF render time with fonts and styles prepared for every render '
+            '(cold) and with the shared process renderer (warm)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=50,
+                            help='Number of PDFs to render in each mode')
+        parser.add_argument('--paragraphs', type=int, default=40,
+                            help='Number of contract paragraphs in the sample PDF')
+
+    def handle(self, *args, **options):
+        inputs = {
+            'layout': CONTRACT_PDF_LAYOUT,
+            'template': None,
+            'content': '\n'.join([SAMPLE_PARAGRAPH] * options['paragraphs']),
+            'property_title': 'Mieszkanie dwupokojowe',
+            'property_location': 'Kraków',
+            'landlord': 'Jan Kowalski',
+            'tenant': 'Anna Nowak',
+            'created': 'January 01, 2025',
+            'tenant_signature': '⏳ Pending',
+            'landlord_signature': '⏳ Pending',
+        }
+        renders = max(1, options['renders'])
+
+        def measure(get_renderer):
+            timings = []
+            for _ in range(renders):
+                started = time.perf_counter()
+                get_renderer().render(inputs)
+                timings.append(time.perf_counter() - started)
+            return sorted(timings)
+
+        # Cold is what every request paid before: fonts parsed and styles built per PDF.
+        cold = measure(ContractPdfRenderer)
+        contract_pdf_renderer()
+        warm = measure(contract_pdf_renderer)
+
+        for label, timings in (('cold', cold), ('warm', warm)):
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{label}: p50 {statistics.median(timings) * 1000:.1f} ms, '
+                f'p95 {p95 * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{renders} renders per mode, warm p50 is '
+            f'{statistics.median(cold) / statistics.median(warm):.1f}x faster'
+        ))
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing
+import os
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from PIL import Image
+
+from RentEaseApp.images import VARIANT_SIZES, VARIANT_FORMATS, render_variants
+from RentEaseApp.models import Photo
+from RentEaseApp.photo_storage import open_photo, save_variants
+
+
+class Command(BaseCommand):
+    help = 'Generates missing resized variants (card/gallery/full, WebP/JPEG) for existing photos in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes rendering images')
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render variants even for photos that already have all of them')
+
+    def handle(self, *args, **options):
+        variant_count = len(VARIANT_SIZES) * len(VARIANT_FORMATS)
+        photos = Photo.objects.order_by('id')
+        if not options['force']:
+            photos = photos.annotate(n_variants=Count('variants')).filter(n_variants__lt=variant_count)
+        photo_ids = list(photos.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(f'Found {len(photo_ids)} photos to process'))
+
+        workers = max(1, options['workers'])
+        done = failed = 0
+        # Workers only get bytes and return bytes; all database work stays in this process.
+        # 'spawn' keeps the children from inheriting this process's database connection.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            pending = {}
+            remaining = iter(photo_ids)
+            while True:
+                # Keep a bounded number of originals in flight so memory stays flat.
+                while len(pending) < workers * 2:
+                    photo_id = next(remaining, None)
+                    if photo_id is None:
+                        break
+                    photo = Photo.objects.select_related('blob').defer('blob__data').get(id=photo_id)
+                    original = open_photo(photo)
+                    if original is None:
+                        failed += 1
+                        continue
+                    with original:
+                        pending[executor.submit(render_variants, original.read())] = photo_id
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    photo_id = pending.pop(future)
+                    try:
+                        save_variants(photo_id, future.result())
+                        done += 1
+                    except (OSError, ValueError, Image.DecompressionBombError) as e:
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f'Photo {photo_id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {done} photos ({failed} skipped)'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from RentEaseApp.conversations import recompute_conversation_counters
+from RentEaseApp.models import Conversation, Message
+
+
+class Command(BaseCommand):
+    help = 'Recomputes unread counters and last-message columns of all conversations from their messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of conversations updated per transaction')
+
+    def handle(self, *args, **options):
+        processed = recompute_conversation_counters(Conversation, Message, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed counters of {processed} conversations'))
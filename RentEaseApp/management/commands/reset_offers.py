@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth.hashers import make_password
-from RentEaseApp.models import LandlordUser, Offer, Photo
-import base64
+from RentEaseApp.models import LandlordUser, Offer
+from RentEaseApp.photo_storage import create_photo
 import random
 import os
 import glob
@@ -154,7 +154,7 @@ class Command(BaseCommand):
                 if photo_index < len(photo_files):
                     photo_path = photo_files[photo_index]
                     with open(photo_path, 'rb') as f:
-                        photo_data = base64.b64encode(f.read()).decode('utf-8')
+                        content = f.read()
                     ext = os.path.splitext(photo_path)[1].lower()
                     content_types = {
                         '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg',
@@ -162,11 +162,7 @@ class Command(BaseCommand):
                         '.webp': 'image/webp',
                     }
                     content_type = content_types.get(ext, 'image/jpeg')
-                    Photo.objects.create(
-                        offer=offer,
-                        photo_data=photo_data,
-                        content_type=content_type
-                    )
+                    create_photo(offer, content, content_type)
                     photo_index += 1
 
             created_count += 1
@@ -0,0 +1,62 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from RentEaseApp.pdf import contract_pdf_renderer, render_contract_pdf
+from RentEaseApp.pdf_jobs import claim_jobs, fail_job, finish_job, prune_previews
+
+PREVIEW_MAX_AGE = 24 * 60 * 60
+PRUNE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Renders queued contract PDFs in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Number of worker processes rendering PDFs')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between queue checks while idle')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for new jobs')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        done = failed = 0
+        last_prune = 0
+        # Workers only get the JSON inputs and return bytes; all database and file work stays here.
+        # 'spawn' keeps the children from inheriting this process's database connection.
+        # Each child loads fonts and styles on start, before its first job.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=contract_pdf_renderer) as executor:
+            pending = {}
+            while True:
+                # Keep every process busy plus one queued job each, no more: the rest stay
+                # claimable by other workers.
+                if len(pending) < workers * 2:
+                    for job in claim_jobs(workers * 2 - len(pending)):
+                        pending[executor.submit(render_contract_pdf, job.inputs)] = job
+                if not pending:
+                    if options['once']:
+                        break
+                    if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                        prune_previews(PREVIEW_MAX_AGE)
+                        last_prune = time.monotonic()
+                    time.sleep(poll_interval)
+                    continue
+                finished, _ = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = pending.pop(future)
+                    try:
+                        finish_job(job, future.result())
+                        done += 1
+                    except Exception as e:
+                        fail_job(job, e)
+                        failed += 1
+                        self.stdout.write(self.style.WARNING(f'Job {job.key[:12]}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {done} PDFs ({failed} failed)'))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0013_photo_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('size', models.PositiveIntegerField(help_text='Size in bytes')),
+                ('storage', models.CharField(help_text='Backend holding the bytes (see photo_storage.PHOTO_STORAGES)', max_length=20)),
+                ('data', models.BinaryField(blank=True, help_text='Raw bytes when stored by the database backend', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='content_type',
+            field=models.CharField(default='image/jpeg', help_text='MIME type (e.g. image/jpeg, image/png)', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='photo',
+            name='photo_data',
+            field=models.TextField(blank=True, default='', help_text='Legacy base64 payload, emptied once converted to blob storage'),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='photos', to='RentEaseApp.photoblob'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import base64
+import hashlib
+import os
+
+from django.conf import settings
+from django.db import IntegrityError, migrations, transaction
+
+BATCH_SIZE = 50
+
+
+def save_blob(PhotoBlob, content):
+    """Frozen copy of photo_storage.save_blob: one PhotoBlob per distinct content."""
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob = PhotoBlob.objects.filter(sha256=sha256).defer('data').first()
+    if blob:
+        return blob
+    storage = getattr(settings, 'PHOTO_STORAGE_BACKEND', 'database')
+    blob = PhotoBlob(sha256=sha256, size=len(content), storage=storage)
+    if storage == 'filesystem':
+        path = os.path.join(str(settings.PHOTO_STORAGE_ROOT), sha256[:2], sha256[2:4], sha256)
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+    elif storage == 'database':
+        blob.data = content
+    else:
+        raise ValueError(f"Unknown photo storage backend: {storage!r}")
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        blob = PhotoBlob.objects.defer('data').get(sha256=sha256)
+    return blob
+
+
+def convert_base64_photos(apps, schema_editor):
+    """Move base64 photo_data into blob storage in small committed batches (safe to re-run)."""
+    Photo = apps.get_model('RentEaseApp', 'Photo')
+    PhotoBlob = apps.get_model('RentEaseApp', 'PhotoBlob')
+    last_id = 0
+    while True:
+        ids = list(
+            Photo.objects.filter(blob__isnull=True, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            for photo_id in ids:
+                photo_data = Photo.objects.filter(id=photo_id).values_list('photo_data', flat=True).get()
+                if not photo_data:
+                    continue
+                try:
+                    content = base64.b64decode(photo_data)
+                except (ValueError, TypeError):
+                    continue
+                blob = save_blob(PhotoBlob, content)
+                Photo.objects.filter(id=photo_id).update(blob=blob, photo_data='')
+        last_id = ids[-1]
+
+
+def reverse_migrate(apps, schema_editor):
+    """Blobs stay readable through Photo.blob - no-op."""
+    pass
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so an interrupted `migrate` resumes where it stopped.
+    atomic = False
+
+    dependencies = [
+        ('RentEaseApp', '0014_photoblob'),
+    ]
+
+    operations = [
+        # Image bytes are already compressed; skip TOAST compression attempts on them.
+        migrations.RunSQL(
+            'ALTER TABLE "RentEaseApp_photoblob" ALTER COLUMN "data" SET STORAGE EXTERNAL;',
+            reverse_sql='ALTER TABLE "RentEaseApp_photoblob" ALTER COLUMN "data" SET STORAGE EXTENDED;',
+        ),
+        migrations.RunPython(convert_base64_photos, reverse_migrate),
+    ]
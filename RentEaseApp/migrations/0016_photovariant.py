@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0015_convert_base64_photos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(help_text='card, gallery or full', max_length=20)),
+                ('format', models.CharField(help_text='webp or jpeg', max_length=10)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='variants', to='RentEaseApp.photoblob')),
+                ('photo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='RentEaseApp.photo')),
+            ],
+            options={
+                'unique_together': {('photo', 'size', 'format')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0016_photovariant'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('status', 'Unavailable'), _negated=True), fields=['-created_at', '-id'], name='offer_listed_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('status', 'Unavailable'), _negated=True), fields=['sale_or_rent', 'price'], name='offer_listed_type_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('status', 'Unavailable'), _negated=True), fields=['sale_or_rent', 'area'], name='offer_listed_type_area_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=models.Index(condition=models.Q(('status', 'Unavailable'), _negated=True), fields=['sale_or_rent', 'number_of_rooms', 'price'], name='offer_listed_type_rooms_idx'),
+        ),
+    ]
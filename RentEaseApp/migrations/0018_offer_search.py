@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:44
+
+import unicodedata
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models, transaction
+from django.db.models import Value
+
+BATCH_SIZE = 200
+
+# Frozen copy of search.normalize_search_text as of this migration.
+_EXTRA_FOLDING = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss'})
+
+
+def normalize_search_text(text):
+    text = (text or '').lower().translate(_EXTRA_FOLDING)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def fill_search_columns(apps, schema_editor):
+    """Compute search_location and search_vector for existing offers, committing batch by batch."""
+    Offer = apps.get_model('RentEaseApp', 'Offer')
+    last_id = 0
+    while True:
+        rows = list(
+            Offer.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'title', 'location', 'body')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        with transaction.atomic():
+            for offer_id, title, location, body in rows:
+                Offer.objects.filter(id=offer_id).update(
+                    search_location=normalize_search_text(location),
+                    search_vector=(
+                        SearchVector(Value(normalize_search_text(title)), weight='A', config='simple')
+                        + SearchVector(Value(normalize_search_text(location)), weight='B', config='simple')
+                        + SearchVector(Value(normalize_search_text(body)), weight='C', config='simple')
+                    ),
+                )
+        last_id = rows[-1][0]
+
+
+# pg_trgm is a contrib extension; skip the trigram index (substring search then
+# falls back to a scan) on servers that do not ship it or refuse CREATE EXTENSION.
+CREATE_TRIGRAM_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS offer_search_location_trgm_idx
+            ON "RentEaseApp_offer" USING gin (search_location gin_trgm_ops);
+    ELSE
+        RAISE NOTICE 'pg_trgm not available, offer_search_location_trgm_idx not created';
+    END IF;
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE NOTICE 'cannot create pg_trgm, offer_search_location_trgm_idx not created';
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch instead of holding one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('RentEaseApp', '0017_offer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='search_location',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='offer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='offer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='offer_search_vector_idx'),
+        ),
+        migrations.RunPython(fill_search_columns, migrations.RunPython.noop),
+        migrations.RunSQL(CREATE_TRIGRAM_INDEX, 'DROP INDEX IF EXISTS offer_search_location_trgm_idx;'),
+    ]
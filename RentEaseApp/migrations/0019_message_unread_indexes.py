@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0018_offer_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('read_by_landlord', False), ('sender_type', 'tenant')), fields=['conversation', 'created_at'], name='message_unread_landlord_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('read_by_tenant', False), ('sender_type', 'landlord')), fields=['conversation', 'created_at'], name='message_unread_tenant_idx'),
+        ),
+    ]
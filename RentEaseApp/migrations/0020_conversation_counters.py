@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:51
+
+from django.db import migrations, models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+
+
+def fill_counters(apps, schema_editor):
+    # A frozen copy of the recompute as of this migration (per-message read flags,
+    # which later migrations replace): app code must not be imported here.
+    Conversation = apps.get_model('RentEaseApp', 'Conversation')
+    Message = apps.get_model('RentEaseApp', 'Message')
+
+    def unread(sender_type, read_flag):
+        counts = (
+            Message.objects.filter(conversation=OuterRef('pk'), sender_type=sender_type, **{read_flag: False})
+            .order_by()
+            .values('conversation')
+            .annotate(n=Count('id'))
+            .values('n')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+    last_id = 0
+    while True:
+        ids = list(
+            Conversation.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:1000]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            Conversation.objects.filter(id__in=ids).update(
+                unread_for_landlord=unread('tenant', 'read_by_landlord'),
+                unread_for_tenant=unread('landlord', 'read_by_tenant'),
+                last_message_at=Subquery(latest.values('created_at')[:1]),
+                last_message_preview=Coalesce(
+                    Subquery(latest.annotate(preview=Substr('content', 1, 100)).values('preview')[:1]),
+                    Value('')
+                ),
+            )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch instead of holding one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('RentEaseApp', '0019_message_unread_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_preview',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='unread_for_landlord',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='unread_for_tenant',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0021_message_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(models.F('landlord'), models.OrderBy(models.F('last_message_at'), descending=True, nulls_last=True), name='conv_landlord_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(models.F('tenant'), models.OrderBy(models.F('last_message_at'), descending=True, nulls_last=True), name='conv_tenant_inbox_idx'),
+        ),
+    ]
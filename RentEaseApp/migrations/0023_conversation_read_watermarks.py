@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:02
+
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_watermarks(apps, schema_editor):
+    """
+    Derive the read watermarks from the per-message read_by_* flags.
+
+    A reader's watermark ends just before the oldest message they have not
+    read, or at the latest message when everything is read, so no unread
+    message is ever reported as read.
+    """
+    Conversation = apps.get_model('RentEaseApp', 'Conversation')
+    Message = apps.get_model('RentEaseApp', 'Message')
+
+    def aggregate(value, **filters):
+        return Subquery(
+            Message.objects.filter(conversation=OuterRef('pk'), **filters)
+            .order_by()
+            .values('conversation')
+            .annotate(value=value)
+            .values('value')
+        )
+
+    def watermark(sender_type, read_flag):
+        return Coalesce(
+            aggregate(Min('id'), sender_type=sender_type, **{read_flag: False}) - 1,
+            aggregate(Max('id')),
+            Value(0),
+        )
+
+    last_id = 0
+    while True:
+        ids = list(
+            Conversation.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:1000]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            Conversation.objects.filter(id__in=ids).update(
+                last_read_by_landlord=watermark('tenant', 'read_by_landlord'),
+                last_read_by_tenant=watermark('landlord', 'read_by_tenant'),
+                last_message_id=Coalesce(aggregate(Max('id')), Value(0)),
+            )
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch instead of holding one long transaction.
+    atomic = False
+
+    dependencies = [
+        ('RentEaseApp', '0022_conversation_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_read_by_landlord',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_read_by_tenant',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        # Watermarks are derived from the read flags, so the flags go only afterwards.
+        migrations.RunPython(fill_watermarks, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_unread_landlord_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_unread_tenant_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_by_landlord',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_by_tenant',
+        ),
+    ]
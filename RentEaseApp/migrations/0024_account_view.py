@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+# UNION ALL keeps the email predicate pushed down to each table's unique email index.
+CREATE_ACCOUNT_VIEW = """
+CREATE VIEW "RentEaseApp_account" AS
+    SELECT 'landlord:' || id AS key, 'landlord'::varchar(10) AS user_type, id AS user_id, email, password, name
+    FROM "RentEaseApp_landlorduser"
+    UNION ALL
+    SELECT 'tenant:' || id AS key, 'tenant'::varchar(10) AS user_type, id AS user_id, email, password, name
+    FROM "RentEaseApp_tenantuser";
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('RentEaseApp', '0023_conversation_read_watermarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('user_type', models.CharField(max_length=10)),
+                ('user_id', models.BigIntegerField()),
+                ('email', models.EmailField(max_length=254)),
+                ('password', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=100)),
+            ],
+            options={
+                'db_table': 'RentEaseApp_account',
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(CREATE_ACCOUNT_VIEW, 'DROP VIEW IF EXISTS "RentEaseApp_account";'),
+    ]
@@ -1,4 +1,11 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+from django.urls import reverse
+
+from .events import publish_after_commit
+from .search import normalize_search_text, offer_search_vector
 
 
 class LandlordUser(models.Model):
@@ -61,6 +68,37 @@ class TenantUser(models.Model):
         return ", ".join(parts) if parts else ""
 
 
+class Account(models.Model):
+    """
+    Read-only database view over LandlordUser and TenantUser (see migration 0024).
+
+    Lets login find a user of either type with one query on the users' unique
+    email indexes; being a view, it never needs to be kept in sync.
+    """
+    key = models.CharField(primary_key=True, max_length=40)  # "<user_type>:<user_id>"
+    user_type = models.CharField(max_length=10)
+    user_id = models.BigIntegerField()
+    email = models.EmailField()
+    password = models.CharField(max_length=255)
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        managed = False
+        db_table = 'RentEaseApp_account'
+
+    def __str__(self):
+        return f"{self.user_type} {self.email}"
+
+
+SEARCH_SOURCE_FIELDS = {'title', 'location', 'body'}
+
+
+class OfferManager(models.Manager):
+    def get_queryset(self):
+        # The tsvector is only needed inside search queries, never for rendering.
+        return super().get_queryset().defer('search_vector')
+
+
 class Offer(models.Model):
     SALE_OR_RENT_CHOICES = [
         ('Sale', 'Sale'),
@@ -163,13 +201,109 @@ class Offer(models.Model):
         help_text="Tenant who rented/bought this offer"
     )
 
+    # Maintained by save() from title, location and body (see search.py).
+    search_location = models.CharField(max_length=255, blank=True, default="", editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = OfferManager()
+
+    class Meta:
+        # Partial indexes cover only listed offers (the search never shows 'Unavailable' ones)
+        # and match the most common filter shapes of the main search page.
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=~models.Q(status='Unavailable'),
+                name='offer_listed_recent_idx',
+            ),
+            models.Index(
+                fields=['sale_or_rent', 'price'],
+                condition=~models.Q(status='Unavailable'),
+                name='offer_listed_type_price_idx',
+            ),
+            models.Index(
+                fields=['sale_or_rent', 'area'],
+                condition=~models.Q(status='Unavailable'),
+                name='offer_listed_type_area_idx',
+            ),
+            models.Index(
+                fields=['sale_or_rent', 'number_of_rooms', 'price'],
+                condition=~models.Q(status='Unavailable'),
+                name='offer_listed_type_rooms_idx',
+            ),
+            GinIndex(fields=['search_vector'], name='offer_search_vector_idx'),
+            # search_location also has a pg_trgm GIN index for substring matching,
+            # created by migration 0018 where the extension is available.
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or SEARCH_SOURCE_FIELDS.intersection(update_fields):
+            self.search_location = normalize_search_text(self.location)
+            self.search_vector = offer_search_vector(self.title, self.location, self.body)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_location', 'search_vector'}
+        super().save(*args, **kwargs)
+        # The column now holds the computed vector; drop the expression so it loads lazily.
+        self.__dict__.pop('search_vector', None)
+
+
+class PhotoBlobQuerySet(models.QuerySet):
+    def with_data(self):
+        """Also load the raw bytes, which are deferred by default."""
+        return self.defer(None)
+
+
+class PhotoBlobManager(models.Manager.from_queryset(PhotoBlobQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer('data')
+
+
+class PhotoBlob(models.Model):
+    """Content-addressed image bytes (SHA-256), shared by identical uploads."""
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.PositiveIntegerField(help_text="Size in bytes")
+    storage = models.CharField(
+        max_length=20,
+        help_text="Backend holding the bytes (see photo_storage.PHOTO_STORAGES)"
+    )
+    data = models.BinaryField(null=True, blank=True, help_text="Raw bytes when stored by the database backend")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PhotoBlobManager()
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.storage})"
+
+
+class PhotoQuerySet(models.QuerySet):
+    def with_data(self):
+        """Also load the legacy base64 payload, which is deferred by default."""
+        return self.defer(None)
+
+
+class PhotoManager(models.Manager.from_queryset(PhotoQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer('photo_data')
+
 
 class Photo(models.Model):
-    """Photo stored as base64 string in database (no filesystem storage)."""
-    photo_data = models.TextField(help_text="Base64-encoded image data")
+    """Offer photo; the bytes live in a PhotoBlob handled by the configured storage backend."""
+    blob = models.ForeignKey(
+        PhotoBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="photos"
+    )
+    photo_data = models.TextField(
+        blank=True,
+        default="",
+        help_text="Legacy base64 payload, emptied once converted to blob storage"
+    )
     content_type = models.CharField(
         max_length=50,
         default="image/jpeg",
@@ -180,16 +314,48 @@ class Photo(models.Model):
         on_delete=models.CASCADE,
         related_name="photos"
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PhotoManager()
 
     @property
-    def data_uri(self):
-        """Return data URI for use in <img src='...'>."""
-        if self.photo_data and self.content_type:
-            return f"data:{self.content_type};base64,{self.photo_data}"
-        return None
+    def url(self):
+        """Return URL of the cacheable photo endpoint for use in <img src='...'>."""
+        return reverse('photo', args=[self.pk])
+
+    def variant_url(self, size, fmt):
+        """Return URL of a resized derivative (see images.VARIANT_SIZES / VARIANT_FORMATS)."""
+        return reverse('photo_variant', args=[self.pk, size, fmt])
+
+    def __str__(self):
+        return f"Photo {self.pk} for offer {self.offer_id}"
+
+
+class PhotoVariant(models.Model):
+    """Resized, EXIF-free derivative of a Photo, stored like any other blob."""
+    photo = models.ForeignKey(
+        Photo,
+        on_delete=models.CASCADE,
+        related_name="variants"
+    )
+    size = models.CharField(max_length=20, help_text="card, gallery or full")
+    format = models.CharField(max_length=10, help_text="webp or jpeg")
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    blob = models.ForeignKey(
+        PhotoBlob,
+        on_delete=models.PROTECT,
+        related_name="variants"
+    )
+
+    class Meta:
+        unique_together = ['photo', 'size', 'format']
 
     def __str__(self):
-        return f"Photo for {self.offer.title}"
+        return f"{self.size}.{self.format} of photo {self.photo_id}"
+
+
+MESSAGE_PREVIEW_LENGTH = 100
 
 
 class Conversation(models.Model):
@@ -210,18 +376,85 @@ class Conversation(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized from Message; maintained by add_message()/mark_read(), rebuilt by
+    # the repair_conversation_counters command.
+    unread_for_landlord = models.PositiveIntegerField(default=0)
+    unread_for_tenant = models.PositiveIntegerField(default=0)
+    last_message_id = models.PositiveBigIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    last_message_preview = models.CharField(max_length=MESSAGE_PREVIEW_LENGTH, blank=True, default="")
+
+    # Read watermarks: id of the last message each side has seen. Messages from the
+    # other side with a higher id are unread.
+    last_read_by_landlord = models.PositiveBigIntegerField(default=0)
+    last_read_by_tenant = models.PositiveBigIntegerField(default=0)
+
     class Meta:
         unique_together = ['offer', 'landlord', 'tenant']
+        # Inbox pages: a user's conversations by last activity.
+        indexes = [
+            models.Index(
+                models.F('landlord'), models.F('last_message_at').desc(nulls_last=True),
+                name='conv_landlord_inbox_idx',
+            ),
+            models.Index(
+                models.F('tenant'), models.F('last_message_at').desc(nulls_last=True),
+                name='conv_tenant_inbox_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Conversation for {self.offer.title} - {self.landlord.name} & {self.tenant.name}"
 
+    def add_message(self, sender_type, sender_id, content):
+        """Create a message and update the conversation counters in the same transaction"""
+        recipient_type = 'tenant' if sender_type == 'landlord' else 'landlord'
+        with transaction.atomic():
+            message = Message.objects.create(
+                conversation=self,
+                sender_id=sender_id,
+                sender_type=sender_type,
+                content=content
+            )
+            # F() increment: concurrent senders never lose each other's update.
+            Conversation.objects.filter(pk=self.pk).update(**{
+                f"unread_for_{recipient_type}": models.F(f"unread_for_{recipient_type}") + 1,
+                # Greatest(): a slower concurrent sender never moves the id backwards.
+                "last_message_id": Greatest(models.F("last_message_id"), message.id),
+                "last_message_at": message.created_at,
+                "last_message_preview": content[:MESSAGE_PREVIEW_LENGTH],
+            })
+            recipient_id = self.tenant_id if recipient_type == 'tenant' else self.landlord_id
+            publish_after_commit(recipient_type, recipient_id, {"type": "message", "conversation_id": self.pk})
+        return message
+
+    def mark_read(self, user_type):
+        """Mark messages from the other side as read by `user_type` ('landlord' or 'tenant')"""
+        watermark = f"last_read_by_{user_type}"
+        unread = f"unread_for_{user_type}"
+        # One single-row UPDATE moving the watermark to the latest message; a no-op
+        # (and no row write) when everything is already read. A message whose
+        # transaction committed after a newer one counts as unread below the
+        # watermark, so a non-zero counter is cleared as well.
+        updated = Conversation.objects.filter(
+            models.Q(**{f"{watermark}__lt": models.F("last_message_id")}) | models.Q(**{f"{unread}__gt": 0}),
+            pk=self.pk,
+        ).update(**{
+            watermark: models.F("last_message_id"),
+            unread: 0,
+        })
+        if updated:
+            reader_id = self.tenant_id if user_type == 'tenant' else self.landlord_id
+            publish_after_commit(user_type, reader_id, {"type": "read", "conversation_id": self.pk})
+        setattr(self, unread, 0)
+
 
 class Message(models.Model):
     conversation = models.ForeignKey(
         Conversation,
         on_delete=models.CASCADE,
-        related_name="messages"
+        related_name="messages",
+        db_index=False  # covered by message_history_idx
     )
     sender_id = models.IntegerField(help_text="ID of sender (LandlordUser or TenantUser)")
     sender_type = models.CharField(
@@ -231,19 +464,15 @@ class Message(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    read_by_landlord = models.BooleanField(default=False)
-    read_by_tenant = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Message history pages: keyset pagination on (created_at, id) within a conversation.
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_history_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender_type} in conversation {self.conversation.id}"
-    
-    def mark_as_read(self, user_type):
-        """Mark message as read by landlord or tenant"""
-        if user_type == 'landlord':
-            self.read_by_landlord = True
-        elif user_type == 'tenant':
-            self.read_by_tenant = True
-        self.save()
 
 
 class Favorite(models.Model):
@@ -330,3 +559,41 @@ class Contract(models.Model):
     
     def __str__(self):
         return f"Contract for {self.offer.title} - {self.tenant.name}"
+
+
+class PdfRenderJob(models.Model):
+    """A PDF waiting for, or produced by, the rendering worker (see pdf_jobs.py)"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    key = models.CharField(max_length=64, unique=True, help_text="SHA-256 of the inputs; names the rendered file")
+    contract = models.ForeignKey(
+        Contract,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="pdf_jobs",
+        help_text="Empty for template previews"
+    )
+    inputs = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's queue: pending jobs oldest first.
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='pdf_job_queue_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"PDF job {self.key[:12]} ({self.status})"
@@ -0,0 +1,212 @@
+"""
+Declarative offer search filters.
+
+The filter set is derived from Offer field metadata: every IntegerField gets
+a `<param>_from` / `<param>_to` range, every CharField with choices an exact
+match; `q` adds a full-text search (see search.py). Query parameters are
+cleaned into a normalized dict once and compiled into a single Q expression
+for the listing query. The same filters drive the facet counts shown next to
+every filter option.
+"""
+from django.db import models
+from django.db.models import Count, Q
+
+from .listing_cache import cached_listing
+from .models import Offer
+from .search import normalize_search_text, offer_search_query
+
+# Fields never exposed as user filters (the listing applies its own status rule).
+EXCLUDED_FIELDS = {'status'}
+
+# Query parameter names that differ from the model field name.
+PARAM_ALIASES = {
+    'number_of_rooms': 'rooms',
+    'year_built': 'year',
+    'minimum_rental_period': 'rental_period',
+}
+
+# Free-text fields -> (column, lookup, normalizer) used to match them. Location is
+# matched against its diacritic-free copy, which has a trigram index.
+TEXT_FILTERS = {
+    'location': ('search_location', 'contains', normalize_search_text),
+    'floor': ('floor', 'exact', None),
+}
+
+# Query parameter of the full-text search box, and the number of words kept from it.
+SEARCH_PARAM = 'q'
+MAX_SEARCH_WORDS = 8
+
+
+class RangeFilter:
+    """Inclusive numeric range: <param>_from <= field <= <param>_to."""
+
+    def __init__(self, field_name, param):
+        self.field_name = field_name
+        self.params = (f'{param}_from', f'{param}_to')
+
+    def clean(self, query):
+        cleaned = {}
+        for param in self.params:
+            value = query.get(param, '')
+            if value:
+                try:
+                    cleaned[param] = int(value)
+                except ValueError:
+                    pass
+        return cleaned
+
+    def to_q(self, cleaned):
+        param_from, param_to = self.params
+        lookups = {}
+        if param_from in cleaned:
+            lookups[f'{self.field_name}__gte'] = cleaned[param_from]
+        if param_to in cleaned:
+            lookups[f'{self.field_name}__lte'] = cleaned[param_to]
+        return Q(**lookups)
+
+
+class ValueFilter:
+    """Single-parameter match (exact choice, or a text lookup on `column`)."""
+
+    def __init__(self, field_name, param, lookup='exact', choices=None, column=None, normalize=None):
+        self.field_name = field_name
+        self.params = (param,)
+        self.lookup = lookup
+        self.choices = choices
+        self.column = column or field_name
+        self.normalize = normalize
+
+    def clean(self, query):
+        value = query.get(self.params[0], '')
+        if value and self.normalize:
+            value = self.normalize(value)
+        return {self.params[0]: value} if value else {}
+
+    def to_q(self, cleaned):
+        if self.params[0] not in cleaned:
+            return Q()
+        return Q(**{f'{self.column}__{self.lookup}': cleaned[self.params[0]]})
+
+
+class SearchFilter:
+    """Full-text match of every word (as a prefix) against Offer.search_vector."""
+
+    def __init__(self, param):
+        self.field_name = 'search_vector'
+        self.params = (param,)
+
+    def clean(self, query):
+        words = ' '.join(normalize_search_text(query.get(self.params[0], '')).split()[:MAX_SEARCH_WORDS])
+        return {self.params[0]: words} if offer_search_query(words) else {}
+
+    def query(self, cleaned):
+        """SearchQuery for the cleaned parameters, or None when no search is active."""
+        if self.params[0] not in cleaned:
+            return None
+        return offer_search_query(cleaned[self.params[0]])
+
+    def to_q(self, cleaned):
+        query = self.query(cleaned)
+        return Q(search_vector=query) if query else Q()
+
+
+def build_offer_filters():
+    """Derive the filter specification from Offer field metadata."""
+    filters = []
+    for field in Offer._meta.get_fields():
+        if not isinstance(field, models.Field) or field.name in EXCLUDED_FIELDS:
+            continue
+        param = PARAM_ALIASES.get(field.name, field.name)
+        if isinstance(field, models.IntegerField) and not field.primary_key:
+            filters.append(RangeFilter(field.name, param))
+        elif isinstance(field, models.CharField) and field.choices:
+            filters.append(ValueFilter(field.name, param, choices=[value for value, _ in field.choices]))
+        elif field.name in TEXT_FILTERS:
+            column, lookup, normalize = TEXT_FILTERS[field.name]
+            filters.append(ValueFilter(field.name, param, lookup=lookup, column=column, normalize=normalize))
+    filters.append(SEARCH_FILTER)
+    return filters
+
+
+SEARCH_FILTER = SearchFilter(SEARCH_PARAM)
+
+OFFER_FILTERS = build_offer_filters()
+
+
+def clean_filter_params(query):
+    """Normalize query parameters: drop empty/invalid values, convert ranges to ints."""
+    cleaned = {}
+    for offer_filter in OFFER_FILTERS:
+        cleaned.update(offer_filter.clean(query))
+    return cleaned
+
+
+def compile_filters(cleaned, exclude_field=None):
+    """Compile cleaned parameters into one Q, optionally leaving out the filter on `exclude_field`."""
+    q = Q()
+    for offer_filter in OFFER_FILTERS:
+        if offer_filter.field_name != exclude_field:
+            q &= offer_filter.to_q(cleaned)
+    return q
+
+
+# Histogram bucket edges for range facets; the last bucket is open-ended.
+FACET_BUCKETS = {
+    'price': (0, 1000, 2000, 3000, 5000, 10000, 250000, 500000, 1000000),
+    'area': (0, 30, 50, 70, 100, 150),
+}
+
+
+def _facet_buckets(field_name):
+    edges = FACET_BUCKETS[field_name]
+    return list(zip(edges, edges[1:] + (None,)))
+
+
+def _compute_facets(cleaned):
+    """
+    Count offers per choice and per range bucket in a single aggregate query.
+
+    Facets are disjunctive: the count for a field's options applies every
+    active filter except the one on that field, so choosing an option does
+    not zero out its siblings.
+    """
+    terms = {'total': Count('id', filter=compile_filters(cleaned))}
+    keys = {}
+    for offer_filter in OFFER_FILTERS:
+        field_name = offer_filter.field_name
+        if isinstance(offer_filter, ValueFilter) and offer_filter.choices:
+            options = [(value, Q(**{field_name: value})) for value in offer_filter.choices]
+        elif field_name in FACET_BUCKETS:
+            options = [
+                ((lower, upper), Q(**{f'{field_name}__gte': lower}) & (Q(**{f'{field_name}__lt': upper}) if upper else Q()))
+                for lower, upper in _facet_buckets(field_name)
+            ]
+        else:
+            continue
+        others = compile_filters(cleaned, exclude_field=field_name)
+        for option, option_q in options:
+            alias = f'facet_{len(keys)}'
+            keys[alias] = (offer_filter, option)
+            terms[alias] = Count('id', filter=others & option_q)
+
+    counts = Offer.objects.exclude(status='Unavailable').aggregate(**terms)
+
+    facets = {'total': counts['total'], 'choices': {}, 'ranges': {}}
+    for alias, (offer_filter, option) in keys.items():
+        if isinstance(option, tuple):
+            lower, upper = option
+            facets['ranges'].setdefault(offer_filter.field_name, []).append(
+                {'from': lower, 'to': upper, 'count': counts[alias]}
+            )
+        else:
+            facets['choices'].setdefault(offer_filter.params[0], {})[option] = counts[alias]
+    for buckets in facets['ranges'].values():
+        highest = max(bucket['count'] for bucket in buckets) or 1
+        for bucket in buckets:
+            bucket['share'] = round(100 * bucket['count'] / highest)
+    return facets
+
+
+def offer_facets(cleaned):
+    """Facet counts for the listing filtered by `cleaned`, cached per cleaned parameters."""
+    return cached_listing('offer-facets', cleaned, lambda: _compute_facets(cleaned))
@@ -0,0 +1,90 @@
+"""
+Keyset (cursor) pagination on (created_at, id), or (rank, id) for search results.
+
+Unlike OFFSET paging, a cursor points at the last row already shown, so the
+cost of a page does not grow with its depth and rows inserted meanwhile never
+shift or duplicate entries on the following pages.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(obj):
+    """Opaque cursor pointing at `obj` (anything with created_at and id)."""
+    raw = f"{obj.created_at.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, obj_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(obj_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, cursor, page_size, descending=True):
+    """
+    Return (items, next_cursor) for the page following `cursor`.
+
+    Rows are ordered by (created_at, id), newest first unless `descending` is
+    False. next_cursor is None on the last page.
+    """
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+    position = decode_cursor(cursor)
+    if position:
+        created_at, obj_id = position
+        if descending:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=obj_id))
+        else:
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=obj_id))
+    items = list(queryset[:page_size + 1])
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_cursor(items[-1])
+    return items, None
+
+
+def encode_rank_cursor(obj):
+    """Opaque cursor pointing at `obj` in a relevance-ordered list (annotated with rank)."""
+    raw = f"{obj.rank!r}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(cursor):
+    """Return (rank, id) from a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        rank, obj_id = raw.rsplit('|', 1)
+        return float(rank), int(obj_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def ranked_page(queryset, cursor, page_size):
+    """
+    Like keyset_page(), for search results ordered by a `rank` annotation
+    (most relevant first, ties broken by id).
+    """
+    queryset = queryset.order_by('-rank', '-id')
+    position = decode_rank_cursor(cursor)
+    if position:
+        rank, obj_id = position
+        queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=obj_id))
+    items = list(queryset[:page_size + 1])
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_rank_cursor(items[-1])
+    return items, None
@@ -0,0 +1,140 @@
+"""
+Contract PDF rendering and the file cache in front of it.
+
+A contract PDF depends only on what it shows: the contract text, property,
+parties, creation date and signature state. contract_pdf_inputs() collects
+exactly those plus the contract id (so look-alike contracts never share a
+rendering job), and their SHA-256 names the rendered file:
+
+    <CONTRACT_PDF_CACHE_ROOT>/<contract id or "previews">/<hash>.pdf
+
+Any change to the inputs yields a new name, so a cached file is never stale,
+and an unchanged contract is downloaded with a file read. The hash doubles as
+the download's ETag. Saving or deleting a contract (e.g. signing it) removes
+its directory, see signals.py. Inputs are plain JSON so they can be handed to
+a rendering worker (see pdf_jobs.py).
+"""
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from django.conf import settings
+
+from .contracts import generate_contract_from_template
+
+# Checked without importing it: ReportLab is only loaded by the first render.
+REPORTLAB_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+
+# Bump when render_contract_pdf() changes what it draws, so cached files are re-rendered.
+CONTRACT_PDF_LAYOUT = 2
+
+
+def contract_text(contract):
+    """The contract body as shown to the parties."""
+    if contract.template and contract.offer and contract.tenant and contract.landlord:
+        return generate_contract_from_template(contract.template, contract.offer, contract.tenant, contract.landlord)
+    return contract.final_content or (contract.template.template_content if contract.template else "")
+
+
+def _signature_line(signed, signed_at):
+    line = '✅ Signed' if signed else '⏳ Pending'
+    if signed and signed_at:
+        line += f" on {signed_at.strftime('%B %d, %Y at %H:%M')}"
+    return line
+
+
+def contract_pdf_inputs(contract):
+    """Everything render_contract_pdf() draws for a contract (offer, tenant, landlord and template loaded)."""
+    template = contract.template
+    return {
+        'layout': CONTRACT_PDF_LAYOUT,
+        # Not drawn, but it keeps keys (and so jobs) apart for contracts that would look identical.
+        'contract': contract.id,
+        'template': [template.id, template.updated_at.isoformat()] if template else None,
+        'content': contract_text(contract),
+        'property_title': contract.offer.title,
+        'property_location': contract.offer.location or 'N/A',
+        'landlord': f"{contract.landlord.name} {contract.landlord.surname}",
+        'tenant': f"{contract.tenant.name} {contract.tenant.surname}",
+        'created': contract.created_at.strftime('%B %d, %Y'),
+        'tenant_signature': _signature_line(contract.signed_by_tenant, contract.signed_by_tenant_at),
+        'landlord_signature': _signature_line(contract.signed_by_landlord, contract.signed_by_landlord_at),
+    }
+
+
+def preview_pdf_inputs(content, landlord, offer=None):
+    """render_contract_pdf() inputs for a template preview: landlord and property filled, tenant as [Label]."""
+    return {
+        'layout': CONTRACT_PDF_LAYOUT,
+        'template': None,
+        'content': content,
+        'property_title': offer.title if offer else "[Property Title]",
+        'property_location': (offer.location or "N/A") if offer else "[Location]",
+        'landlord': f"{landlord.name or ''} {landlord.surname or ''}".strip() or "[Landlord]",
+        'tenant': "[Tenant Name]",
+        'created': date.today().strftime('%B %d, %Y'),
+        'tenant_signature': "[ ] Pending",
+        'landlord_signature': "[ ] Pending",
+    }
+
+
+def contract_pdf_filename(contract):
+    safe_title = "".join(c if c.isalnum() or c in "._-" else "_" for c in contract.offer.title)[:50]
+    return f"contract_{safe_title}_{contract.id}.pdf"
+
+
+def contract_pdf_key(inputs):
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+_renderer = None
+
+
+def contract_pdf_renderer():
+    """The process-wide ContractPdfRenderer, created on first use."""
+    global _renderer
+    if _renderer is None:
+        from .pdf_render import ContractPdfRenderer
+
+        # Two threads may both build one on first use; either result is fine.
+        _renderer = ContractPdfRenderer()
+    return _renderer
+
+
+def render_contract_pdf(inputs):
+    """Build the contract PDF described by `inputs` and return its bytes."""
+    return contract_pdf_renderer().render(inputs)
+
+
+def _pdf_dir(contract_id):
+    # Template previews belong to no contract and share one directory.
+    return os.path.join(settings.CONTRACT_PDF_CACHE_ROOT, str(contract_id) if contract_id else 'previews')
+
+
+def cached_pdf_path(contract_id, key):
+    """Path of the rendered PDF named `key`, or None if it has not been rendered yet."""
+    path = os.path.join(_pdf_dir(contract_id), f'{key}.pdf')
+    return path if os.path.exists(path) else None
+
+
+def store_pdf(contract_id, key, pdf):
+    directory = _pdf_dir(contract_id)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename, so a concurrent download never reads a half-written file.
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(pdf)
+        os.replace(tmp_path, os.path.join(directory, f'{key}.pdf'))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def discard_contract_pdfs(contract_id):
+    """Drop every cached rendering of a contract."""
+    shutil.rmtree(_pdf_dir(contract_id), ignore_errors=True)
@@ -0,0 +1,121 @@
+"""
+Background rendering of contract PDFs.
+
+Rendering takes hundreds of milliseconds of CPU, so request threads do not
+do it themselves. request_pdf() records a PdfRenderJob named by the hash of
+the PDF's inputs (one job per distinct PDF, however many users ask for it);
+the run_pdf_worker command claims pending jobs and renders them in a process
+pool, and clients poll the job status endpoint until the file is ready.
+
+settings.PDF_RENDER_EXECUTOR selects who runs a job:
+
+- 'worker': the run_pdf_worker command (any number of them, on any host
+  sharing CONTRACT_PDF_CACHE_ROOT);
+- 'inline': the requesting process, right away. For tests and for
+  development without a worker running.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PdfRenderJob
+from .pdf import cached_pdf_path, render_contract_pdf, store_pdf
+
+
+def request_pdf(contract_id, inputs, key):
+    """
+    The job producing the PDF named `key`, queued (or, inline, rendered) if the
+    file is missing. Returns None when the file is already there.
+    """
+    if cached_pdf_path(contract_id, key):
+        return None
+    job, created = PdfRenderJob.objects.get_or_create(
+        key=key, defaults={'contract_id': contract_id, 'inputs': inputs}
+    )
+    if not created and job.status in (PdfRenderJob.DONE, PdfRenderJob.FAILED):
+        # The file was discarded (or rendering failed): render it again.
+        PdfRenderJob.objects.filter(pk=job.pk, status=job.status).update(
+            status=PdfRenderJob.PENDING, error='', started_at=None, finished_at=None
+        )
+        job.status = PdfRenderJob.PENDING
+    if settings.PDF_RENDER_EXECUTOR == 'inline' and job.status == PdfRenderJob.PENDING:
+        run_job(job)
+    return job
+
+
+def run_job(job):
+    """Render one job in this process."""
+    try:
+        pdf = render_contract_pdf(job.inputs)
+    except Exception as e:
+        fail_job(job, e)
+    else:
+        finish_job(job, pdf)
+
+
+def wait_for_job(job, deadline, poll_interval=0.2):
+    """
+    Wait until `job` is done or failed, or time.monotonic() passes `deadline`,
+    and return it with its current status.
+    """
+    while job.status in (PdfRenderJob.PENDING, PdfRenderJob.RUNNING) and time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        job.refresh_from_db(fields=['status', 'error'])
+    return job
+
+
+def claim_jobs(limit):
+    """
+    Mark up to `limit` queued jobs as running and return them.
+
+    SKIP LOCKED lets several workers claim concurrently without waiting on
+    each other. Jobs left running for longer than PDF_JOB_TIMEOUT (a worker
+    died) are claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.PDF_JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            PdfRenderJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=PdfRenderJob.PENDING) | Q(status=PdfRenderJob.RUNNING, started_at__lt=stale))
+            .order_by('created_at')[:limit]
+        )
+        PdfRenderJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=PdfRenderJob.RUNNING, started_at=now
+        )
+    for job in jobs:
+        job.status = PdfRenderJob.RUNNING
+        job.started_at = now
+    return jobs
+
+
+def finish_job(job, pdf):
+    store_pdf(job.contract_id, job.key, pdf)
+    job.status = PdfRenderJob.DONE
+    job.finished_at = timezone.now()
+    PdfRenderJob.objects.filter(pk=job.pk).update(status=job.status, error='', finished_at=job.finished_at)
+
+
+def fail_job(job, error):
+    job.status = PdfRenderJob.FAILED
+    job.error = str(error) or type(error).__name__
+    job.finished_at = timezone.now()
+    PdfRenderJob.objects.filter(pk=job.pk).update(status=job.status, error=job.error, finished_at=job.finished_at)
+
+
+def prune_previews(max_age):
+    """Forget template previews finished more than `max_age` seconds ago, files included."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    old = PdfRenderJob.objects.filter(
+        contract__isnull=True, status__in=[PdfRenderJob.DONE, PdfRenderJob.FAILED], finished_at__lt=cutoff
+    )
+    for key in old.values_list('key', flat=True):
+        path = cached_pdf_path(None, key)
+        if path:
+            os.unlink(path)
+    return old.delete()[0]
@@ -0,0 +1,129 @@
+"""
+ReportLab drawing of contract PDFs.
+
+Imported on first render only (see pdf.contract_pdf_renderer), so web
+processes that never render a PDF do not load ReportLab at all. Callers
+check pdf.REPORTLAB_AVAILABLE before getting here.
+"""
+import os
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+
+def register_pdf_fonts():
+    """Register Unicode (DejaVu) fonts for PDF so Polish and other characters render. Returns (normal_font, bold_font)."""
+    _base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sans_paths = [
+        os.path.join(_base, 'static', 'fonts', 'DejaVuSans.ttf'),
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+        '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    ]
+    bold_paths = [
+        os.path.join(_base, 'static', 'fonts', 'DejaVuSans-Bold.ttf'),
+        '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+        '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
+    ]
+    sans = next((p for p in sans_paths if os.path.isfile(p)), None)
+    bold = next((p for p in bold_paths if os.path.isfile(p)), None)
+    if sans:
+        try:
+            pdfmetrics.registerFont(TTFont('DejaVuSans', sans))
+            if bold:
+                pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', bold))
+            return ('DejaVuSans', 'DejaVuSans-Bold' if bold else 'DejaVuSans')
+        except Exception:
+            pass
+    return ('Helvetica', 'Helvetica-Bold')
+
+
+class ContractPdfRenderer:
+    """
+    Fonts and paragraph styles of the contract PDF, prepared once per process.
+
+    Registering the DejaVu fonts parses the TTF files and took most of a
+    render, so it is done when the renderer is created, not for every PDF.
+    """
+
+    def __init__(self):
+        self.font, self.font_bold = register_pdf_fonts()
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor='#1a1a1a',
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            fontName=self.font_bold
+        )
+        self.normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            textColor='#1a1a1a',
+            spaceAfter=12,
+            leading=14,
+            alignment=TA_JUSTIFY,
+            fontName=self.font
+        )
+
+    def render(self, inputs):
+        """Build the contract PDF described by `inputs` and return its bytes."""
+        normal_style = self.normal_style
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4,
+                               rightMargin=72, leftMargin=72,
+                               topMargin=72, bottomMargin=72)
+
+        elements = []
+
+        title = Paragraph("Lease Agreement", self.title_style)
+        elements.append(title)
+        elements.append(Spacer(1, 0.3*inch))
+
+        meta_info = f"""
+        <b>Property:</b> {inputs['property_title']}<br/>
+        <b>Location:</b> {inputs['property_location']}<br/>
+        <b>Landlord:</b> {inputs['landlord']}<br/>
+        <b>Tenant:</b> {inputs['tenant']}<br/>
+        <b>Date Created:</b> {inputs['created']}<br/>
+        """
+        elements.append(Paragraph(meta_info, normal_style))
+        elements.append(Spacer(1, 0.3*inch))
+
+        elements.append(Spacer(1, 0.1*inch))
+        elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
+        elements.append(Spacer(1, 0.2*inch))
+
+        paragraphs = inputs['content'].split('\n')
+        for para in paragraphs:
+            para = para.strip()
+            if para:
+                para = ' '.join(para.split())
+                para = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                elements.append(Paragraph(para, normal_style))
+                elements.append(Spacer(1, 0.1*inch))
+
+        elements.append(Spacer(1, 0.3*inch))
+        elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
+        elements.append(Spacer(1, 0.2*inch))
+
+        signature_info = f"""
+        <b>Signatures:</b><br/><br/>
+        <b>Tenant:</b> {inputs['tenant_signature']}<br/><br/>
+        <b>Landlord:</b> {inputs['landlord_signature']}
+        """
+        elements.append(Paragraph(signature_info, normal_style))
+
+        doc.build(elements)
+
+        pdf = buffer.getvalue()
+        buffer.close()
+        return pdf
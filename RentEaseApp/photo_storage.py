@@ -0,0 +1,173 @@
+"""
+Pluggable, content-addressed storage for offer photo bytes.
+
+Every upload is keyed by the SHA-256 of its content, so identical images are
+stored once and shared by all Photo rows pointing at the same PhotoBlob.
+The backend used for new uploads is chosen with settings.PHOTO_STORAGE_BACKEND;
+each blob remembers the backend that wrote it, so switching backends never
+breaks existing photos.
+"""
+import base64
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from PIL import Image
+
+from .images import render_variants
+
+
+class DatabasePhotoStorage:
+    """Keeps the raw bytes in the PhotoBlob.data (bytea) column."""
+    name = 'database'
+
+    def write(self, blob, content):
+        blob.data = content
+
+    def open(self, blob):
+        if 'data' in blob.get_deferred_fields():
+            data = type(blob).objects.filter(pk=blob.pk).values_list('data', flat=True).get()
+        else:
+            data = blob.data
+        return BytesIO(bytes(data or b''))
+
+
+class FileSystemPhotoStorage:
+    """Keeps the raw bytes in files named by their hash: <root>/ab/cd/abcd...."""
+    name = 'filesystem'
+
+    def __init__(self, root=None):
+        self.root = str(root or settings.PHOTO_STORAGE_ROOT)
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def write(self, blob, content):
+        path = self.path(blob.sha256)
+        if os.path.isfile(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def open(self, blob):
+        return open(self.path(blob.sha256), 'rb')
+
+
+PHOTO_STORAGES = {
+    DatabasePhotoStorage.name: DatabasePhotoStorage,
+    FileSystemPhotoStorage.name: FileSystemPhotoStorage,
+}
+
+
+def get_photo_storage(name=None):
+    """Return the storage backend called `name` (default: settings.PHOTO_STORAGE_BACKEND)."""
+    name = name or getattr(settings, 'PHOTO_STORAGE_BACKEND', DatabasePhotoStorage.name)
+    try:
+        return PHOTO_STORAGES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown photo storage backend: {name!r}")
+
+
+def save_blob(content, blob_model=None):
+    """Store `content` once and return its PhotoBlob (existing one if the bytes were seen before)."""
+    if blob_model is None:
+        from .models import PhotoBlob as blob_model
+    sha256 = hashlib.sha256(content).hexdigest()
+    # Explicit defer: historical models used by migrations lack the deferring manager.
+    blob = blob_model.objects.filter(sha256=sha256).defer('data').first()
+    if blob:
+        return blob
+    storage = get_photo_storage()
+    blob = blob_model(sha256=sha256, size=len(content), storage=storage.name)
+    storage.write(blob, content)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # The same bytes were uploaded concurrently - reuse the winner's row.
+        blob = blob_model.objects.defer('data').get(sha256=sha256)
+    return blob
+
+
+def create_photo(offer, content, content_type=None):
+    """Create a Photo for `offer` from raw image bytes, together with its resized variants."""
+    from .models import Photo
+    blob = save_blob(content)
+    photo = Photo.objects.create(offer=offer, blob=blob, content_type=content_type or 'image/jpeg')
+    generate_variants(photo, content)
+    return photo
+
+
+def save_variants(photo_id, rendered):
+    """Store derivatives returned by images.render_variants() for the photo `photo_id`."""
+    from .models import PhotoVariant
+    for size, fmt, width, height, content in rendered:
+        PhotoVariant.objects.update_or_create(
+            photo_id=photo_id,
+            size=size,
+            format=fmt,
+            defaults={'width': width, 'height': height, 'blob': save_blob(content)}
+        )
+
+
+def generate_variants(photo, content):
+    """Render and store all derivatives of `photo`. Returns False if `content` is not a readable image."""
+    try:
+        rendered = render_variants(content)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return False
+    save_variants(photo.pk, rendered)
+    return True
+
+
+def open_blob(blob):
+    """Return a binary file-like object with the blob bytes."""
+    return get_photo_storage(blob.storage).open(blob)
+
+
+def open_photo(photo):
+    """Return a binary file-like object with the photo bytes, or None if it has none."""
+    if photo.blob_id:
+        return open_blob(photo.blob)
+    if photo.photo_data:
+        return BytesIO(base64.b64decode(photo.photo_data))
+    return None
+
+
+def convert_legacy_photos(photo_model, blob_model, batch_size=50):
+    """
+    Move base64 `photo_data` payloads into blob storage.
+
+    Works through the table in id order, one payload in memory at a time, and
+    commits each batch separately. Converted rows get a blob and an emptied
+    `photo_data`, so an interrupted run simply resumes where it stopped.
+    Returns the number of converted photos.
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        ids = list(
+            photo_model.objects.filter(blob__isnull=True, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return converted
+        with transaction.atomic():
+            for photo_id in ids:
+                photo_data = photo_model.objects.filter(id=photo_id).values_list('photo_data', flat=True).get()
+                if not photo_data:
+                    continue
+                try:
+                    content = base64.b64decode(photo_data)
+                except (ValueError, TypeError):
+                    continue
+                blob = save_blob(content, blob_model=blob_model)
+                photo_model.objects.filter(id=photo_id).update(blob=blob, photo_data='')
+                converted += 1
+        last_id = ids[-1]
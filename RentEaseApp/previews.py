@@ -0,0 +1,173 @@
+"""
+Contract template previews for the template editor.
+
+The editor keeps the server in sync while the landlord types: it posts the
+whole template once, then only the changed span of its structure against
+the last version the server acknowledged (apply_structure_changes). A
+version is the hash of the template and names it in the cache for
+CONTRACT_PREVIEW_CACHE_TIMEOUT seconds.
+
+A rendered preview is cached under a hash of the version plus the landlord
+and property values it shows, and that hash is also its ETag. Editing a
+profile or an offer changes those values and therefore the key, so nothing
+has to be invalidated.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .contracts import compile_placeholders, format_price, get_placeholder_value
+from .forms import ContractPlaceholderForm
+
+FIELD_LABELS = {
+    field: label for _, fields in ContractPlaceholderForm.get_field_groups() for field, label in fields
+}
+
+LANDLORD_LABELS = ('Email', 'Phone', 'Bank Account')
+PROPERTY_LABELS = ('Location', 'Area', 'Rooms', 'Floor', 'Price')
+
+# {{field}} first, then the **Label** shortcuts, the order previews always replaced them in.
+PREVIEW_PLACEHOLDERS = [
+    *(('{{' + field + '}}', field) for field in FIELD_LABELS),
+    *((f'**{label}**', f'**{label}**') for label in LANDLORD_LABELS + PROPERTY_LABELS),
+]
+
+
+class PreviewExpired(Exception):
+    """The base version of a structure diff is no longer cached; the editor must resend the template."""
+
+
+def template_version(template):
+    return hashlib.sha256(json.dumps(template, sort_keys=True).encode()).hexdigest()
+
+
+def _template_key(landlord_id, version):
+    return f'contract-preview:{landlord_id}:{version}'
+
+
+def store_template(landlord_id, template):
+    """Remember a {'content', 'structure'} template for the landlord and return its version."""
+    version = template_version(template)
+    cache.set(_template_key(landlord_id, version), template, settings.CONTRACT_PREVIEW_CACHE_TIMEOUT)
+    return version
+
+
+def load_template(landlord_id, version):
+    """The template stored under `version`; raises PreviewExpired if it is gone."""
+    template = cache.get(_template_key(landlord_id, version))
+    if template is None:
+        raise PreviewExpired(version)
+    return template
+
+
+def structure_content(structure):
+    """template_content of a structure, as the editor builds it: text as is, blocks as {{field}}."""
+    return ''.join(
+        item.get('content', '') if item.get('type') == 'text' else '{{' + item.get('field_name', '') + '}}'
+        for item in structure
+    )
+
+
+def _valid_item(item):
+    return (
+        isinstance(item, dict) and item.get('type') in ('text', 'block')
+        and all(isinstance(item[key], str) for key in ('content', 'field_name', 'label') if key in item)
+    )
+
+
+def apply_structure_changes(structure, changes):
+    """
+    Apply editor changes to a template structure and return the new structure.
+
+    Each change is {"at": index, "remove": count, "insert": [items]}, applied in
+    order like list splicing. Raises ValueError on anything malformed.
+    """
+    structure = list(structure)
+    if not isinstance(changes, list):
+        raise ValueError("Changes must be a list")
+    for change in changes:
+        if not isinstance(change, dict):
+            raise ValueError("Each change must be an object")
+        at, remove, insert = change.get('at'), change.get('remove', 0), change.get('insert', [])
+        if not isinstance(at, int) or not isinstance(remove, int) or not isinstance(insert, list):
+            raise ValueError("Change needs integer 'at'/'remove' and a list 'insert'")
+        if at < 0 or remove < 0 or at + remove > len(structure):
+            raise ValueError("Change is out of range")
+        if not all(_valid_item(item) for item in insert):
+            raise ValueError("Inserted items must be text or block objects with string fields")
+        structure[at:at + remove] = insert
+    return structure
+
+
+def preview_values(landlord, offer=None):
+    """
+    What each placeholder shows in a preview: landlord and property data where
+    known, [Label] otherwise; tenant data is always [Label].
+    """
+    filled = {}
+    for field in FIELD_LABELS:
+        if field.startswith('landlord_') and landlord:
+            filled[field] = get_placeholder_value(field, None, None, landlord)
+        elif field.startswith('property_') and offer:
+            filled[field] = get_placeholder_value(field, offer, None, landlord)
+    labels = {}
+    if landlord:
+        labels.update({
+            'Email': landlord.email, 'Phone': landlord.phone_number, 'Bank Account': landlord.bank_account_number,
+        })
+    if offer:
+        labels.update({
+            'Location': offer.location,
+            'Area': str(offer.area) if offer.area else '',
+            'Rooms': str(offer.number_of_rooms) if offer.number_of_rooms else '',
+            'Floor': offer.floor,
+            'Price': format_price(offer.price) if offer.price else '',
+        })
+    return {
+        'fields': filled,
+        # Without a landlord/offer the **Label** shortcut stays in the text as typed.
+        'labels': {
+            label: (labels[label] or f'[{label}]') if label in labels else f'**{label}**'
+            for label in LANDLORD_LABELS + PROPERTY_LABELS
+        },
+    }
+
+
+def _render(template, values):
+    filled = values['fields']
+    if template.get('structure'):
+        parts = []
+        for item in template['structure']:
+            if item.get('type') == 'text':
+                parts.append(item.get('content', ''))
+            elif item.get('type') == 'block':
+                field = item.get('field_name', '')
+                label = item.get('label') or FIELD_LABELS.get(field, field)
+                parts.append(filled.get(field) or f'[{label}]')
+        return ''.join(parts)
+    slot_values = {field: filled.get(field) or f'[{label}]' for field, label in FIELD_LABELS.items()}
+    slot_values.update({f'**{label}**': value for label, value in values['labels'].items()})
+    return compile_placeholders(template.get('content') or '', PREVIEW_PLACEHOLDERS).fill(slot_values)
+
+
+def _preview_etag(version, values):
+    return hashlib.sha256(json.dumps([version, values], sort_keys=True).encode()).hexdigest()
+
+
+def preview_etag(version, landlord, offer=None):
+    """Hash naming the preview of template `version` for this landlord and offer."""
+    return _preview_etag(version, preview_values(landlord, offer))
+
+
+def render_preview(template, landlord, offer=None):
+    """(preview text, ETag) of a {'content', 'structure'} template, rendered at most once per version and data."""
+    values = preview_values(landlord, offer)
+    etag = _preview_etag(template_version(template), values)
+    key = f'contract-preview-text:{etag}'
+    text = cache.get(key)
+    if text is None:
+        text = _render(template, values)
+        cache.set(key, text, settings.CONTRACT_PREVIEW_CACHE_TIMEOUT)
+    return text, etag
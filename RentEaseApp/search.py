@@ -0,0 +1,83 @@
+"""
+Full-text search over offer title, location and body.
+
+Text is normalized in Python before it reaches Postgres: lower-cased and
+stripped of Polish diacritics ("Łódź" -> "lodz"), so queries typed with or
+without them match. The stock `simple` text search configuration is used
+on the normalized text, which needs no extension (unaccent) or Polish
+dictionary on the database server.
+"""
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'simple'
+
+# Letters NFKD does not decompose into base letter + combining mark.
+_EXTRA_FOLDING = str.maketrans({'ł': 'l', 'đ': 'd', 'ø': 'o', 'ß': 'ss'})
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_search_text(text):
+    """Lower-case `text`, fold diacritics and collapse whitespace."""
+    text = (text or '').lower().translate(_EXTRA_FOLDING)
+    text = ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def offer_search_vector(title, location, body):
+    """Weighted tsvector expression for an offer: title (A), location (B), body (C)."""
+    return (
+        SearchVector(Value(normalize_search_text(title)), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(normalize_search_text(location)), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(Value(normalize_search_text(body)), weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def offer_search_query(text):
+    """
+    SearchQuery matching every word of `text` as a prefix ("krak" finds "Kraków"),
+    or None if `text` has no words.
+    """
+    words = _WORD_RE.findall(normalize_search_text(text))
+    if not words:
+        return None
+    return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_rank(query):
+    """Relevance of an offer for `query`, for ordering search results."""
+    # ts_rank() returns real; as double precision it round-trips exactly through a page cursor.
+    return Cast(SearchRank(F('search_vector'), query), FloatField())
+
+
+def update_search_columns(offer_model, batch_size=200):
+    """
+    Recompute search columns for every offer (backfill after bulk changes).
+
+    Works through the table in id order and commits each batch separately.
+    Returns the number of updated offers.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = list(
+            offer_model.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'title', 'location', 'body')[:batch_size]
+        )
+        if not rows:
+            return updated
+        with transaction.atomic():
+            for offer_id, title, location, body in rows:
+                offer_model.objects.filter(id=offer_id).update(
+                    search_location=normalize_search_text(location),
+                    search_vector=offer_search_vector(title, location, body),
+                )
+        updated += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,39 @@
+"""Model signal receivers (connected in RenteaseappConfig.ready)."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .accounts import forget_account
+from .listing_cache import bump_listing_version
+from .models import Contract, LandlordUser, Offer, Photo, TenantUser
+from .pdf import discard_contract_pdfs
+
+
+@receiver(post_save, sender=Offer)
+@receiver(post_delete, sender=Offer)
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def invalidate_offer_listings(sender, **kwargs):
+    """Offers and their photos are what listing pages and facets show."""
+    # Bump right away so this process stops serving the old pages, and again after commit
+    # to drop pages cached meanwhile by requests that still read the uncommitted state.
+    bump_listing_version()
+    transaction.on_commit(bump_listing_version)
+
+
+@receiver(post_save, sender=LandlordUser)
+@receiver(post_delete, sender=LandlordUser)
+@receiver(post_save, sender=TenantUser)
+@receiver(post_delete, sender=TenantUser)
+def invalidate_cached_account(sender, instance, **kwargs):
+    """Profile edits (ProfileForm.save) must show up on the next request."""
+    user_type = 'landlord' if sender is LandlordUser else 'tenant'
+    forget_account(user_type, instance.pk)
+    transaction.on_commit(lambda: forget_account(user_type, instance.pk))
+
+
+@receiver(post_save, sender=Contract)
+@receiver(post_delete, sender=Contract)
+def discard_cached_contract_pdfs(sender, instance, **kwargs):
+    """Signing (or regenerating) a contract supersedes its rendered PDFs."""
+    discard_contract_pdfs(instance.pk)
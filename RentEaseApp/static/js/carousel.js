@@ -1,7 +1,8 @@
-document.addEventListener("DOMContentLoaded", function() {
-    const carousels = document.querySelectorAll('.carousel-container');
+function initCarousels(root) {
+    const carousels = (root || document).querySelectorAll('.carousel-container:not([data-carousel-ready])');
 
     carousels.forEach(carousel => {
+        carousel.dataset.carouselReady = 'true';
         let slideIndex = 1;
         const slides = carousel.querySelectorAll('.carousel-slide');
         const counter = carousel.querySelector('.carousel-counter');
@@ -32,4 +33,10 @@ document.addEventListener("DOMContentLoaded", function() {
             }
         }
     });
+}
+
+window.initCarousels = initCarousels;
+
+document.addEventListener("DOMContentLoaded", function() {
+    initCarousels(document);
 });
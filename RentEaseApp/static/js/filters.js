@@ -128,3 +128,51 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+
+// Infinite scroll: load the next page of offer cards (same filters) when the sentinel comes into view
+document.addEventListener('DOMContentLoaded', function() {
+    const grid = document.getElementById('offersGrid');
+    const sentinel = document.getElementById('offersSentinel');
+    if (!grid || !sentinel || !('IntersectionObserver' in window)) {
+        return;
+    }
+    let loading = false;
+
+    function loadNextPage() {
+        const cursor = grid.dataset.nextCursor;
+        if (loading || !cursor) {
+            return;
+        }
+        loading = true;
+        const params = new URLSearchParams(window.location.search);
+        params.set('cursor', cursor);
+        fetch(grid.dataset.pageUrl + '?' + params.toString(), {headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(data => {
+                const fragment = document.createElement('div');
+                fragment.innerHTML = data.html;
+                const cards = Array.from(fragment.children);
+                cards.forEach(card => grid.appendChild(card));
+                if (window.initCarousels) {
+                    cards.forEach(card => window.initCarousels(card));
+                }
+                grid.dataset.nextCursor = data.next_cursor || '';
+                if (!data.next_cursor) {
+                    observer.disconnect();
+                }
+            })
+            .catch(error => {
+                console.error('Error loading more offers:', error);
+            })
+            .finally(() => {
+                loading = false;
+            });
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadNextPage();
+        }
+    }, {rootMargin: '600px'});
+    observer.observe(sentinel);
+});
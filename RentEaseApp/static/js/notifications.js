@@ -1,70 +1,107 @@
 // Notification bell functionality
 (function() {
     let notificationCheckInterval;
+    let notificationStream;
     const notificationsUrl = '/notifications';
+    const notificationStreamUrl = '/notifications/stream';
+    const POLL_INTERVAL = 30000;
+    const MAX_STREAM_ERRORS = 3;
     
     function updateNotificationBell() {
         fetch(notificationsUrl)
             .then(response => response.json())
-            .then(data => {
-                const bellIcon = document.getElementById('notificationBell');
-                const badge = document.getElementById('notificationBadge');
-                const dropdown = document.getElementById('notificationDropdown');
-                
-                if (badge) {
-                    if (data.unread_count > 0) {
-                        badge.textContent = data.unread_count > 99 ? '99+' : data.unread_count;
-                        badge.style.display = 'flex';
-                    } else {
-                        badge.style.display = 'none';
-                    }
-                }
+            .then(renderNotifications)
+            .catch(error => {
+                console.error('Error fetching notifications:', error);
+            });
+    }
+    
+    function renderNotifications(data) {
+        const bellIcon = document.getElementById('notificationBell');
+        const badge = document.getElementById('notificationBadge');
+        const dropdown = document.getElementById('notificationDropdown');
+        
+        if (badge) {
+            if (data.unread_count > 0) {
+                badge.textContent = data.unread_count > 99 ? '99+' : data.unread_count;
+                badge.style.display = 'flex';
+            } else {
+                badge.style.display = 'none';
+            }
+        }
+        
+        // Update dropdown content
+        if (dropdown && data.notifications) {
+            const list = dropdown.querySelector('.notification-list');
+            if (list) {
+                list.innerHTML = '';
                 
-                // Update dropdown content
-                if (dropdown && data.notifications) {
-                    const list = dropdown.querySelector('.notification-list');
-                    if (list) {
-                        list.innerHTML = '';
+                if (data.notifications.length === 0) {
+                    list.innerHTML = '<div class="notification-item" style="padding: 15px; text-align: center; color: #666;">No new messages</div>';
+                } else {
+                    data.notifications.forEach(notif => {
+                        const item = document.createElement('div');
+                        item.className = 'notification-item';
+                        item.style.cursor = 'pointer';
+                        item.onclick = () => {
+                            window.location.href = '/conversations/' + notif.conversation_id;
+                        };
+                        
+                        const title = document.createElement('div');
+                        title.className = 'notification-title';
+                        title.textContent = notif.offer_title;
+                        
+                        const content = document.createElement('div');
+                        content.className = 'notification-content';
+                        content.textContent = notif.latest_message;
                         
-                        if (data.notifications.length === 0) {
-                            list.innerHTML = '<div class="notification-item" style="padding: 15px; text-align: center; color: #666;">No new messages</div>';
-                        } else {
-                            data.notifications.forEach(notif => {
-                                const item = document.createElement('div');
-                                item.className = 'notification-item';
-                                item.style.cursor = 'pointer';
-                                item.onclick = () => {
-                                    window.location.href = '/conversations/' + notif.conversation_id;
-                                };
-                                
-                                const title = document.createElement('div');
-                                title.className = 'notification-title';
-                                title.textContent = notif.offer_title;
-                                
-                                const content = document.createElement('div');
-                                content.className = 'notification-content';
-                                content.textContent = notif.latest_message;
-                                
-                                const meta = document.createElement('div');
-                                meta.className = 'notification-meta';
-                                if (notif.tenant_name) {
-                                    meta.textContent = 'From: ' + notif.tenant_name;
-                                } else if (notif.landlord_name) {
-                                    meta.textContent = 'From: ' + notif.landlord_name;
-                                }
-                                
-                                item.appendChild(title);
-                                item.appendChild(content);
-                                item.appendChild(meta);
-                                list.appendChild(item);
-                            });
+                        const meta = document.createElement('div');
+                        meta.className = 'notification-meta';
+                        if (notif.tenant_name) {
+                            meta.textContent = 'From: ' + notif.tenant_name;
+                        } else if (notif.landlord_name) {
+                            meta.textContent = 'From: ' + notif.landlord_name;
                         }
-                    }
+                        
+                        item.appendChild(title);
+                        item.appendChild(content);
+                        item.appendChild(meta);
+                        list.appendChild(item);
+                    });
                 }
-            })
-            .catch(error => {
-                console.error('Error fetching notifications:', error);
-            });
+            }
+        }
+    }
+    
+    function startPolling() {
+        if (!notificationCheckInterval) {
+            updateNotificationBell();
+            notificationCheckInterval = setInterval(updateNotificationBell, POLL_INTERVAL);
+        }
+    }
+    
+    // Server push: one idle connection instead of polling. Falls back to polling
+    // if the browser lacks EventSource or the stream keeps failing.
+    function startNotifications() {
+        if (!window.EventSource) {
+            startPolling();
+            return;
+        }
+        let errors = 0;
+        notificationStream = new EventSource(notificationStreamUrl);
+        notificationStream.addEventListener('notifications', function(event) {
+            errors = 0;
+            renderNotifications(JSON.parse(event.data));
+        });
+        notificationStream.onerror = function() {
+            errors += 1;
+            // CLOSED: the server refused the stream (e.g. 204 without an ASGI server).
+            if (notificationStream.readyState === EventSource.CLOSED || errors >= MAX_STREAM_ERRORS) {
+                notificationStream.close();
+                notificationStream = null;
+                startPolling();
+            }
+        };
     }
     
     function toggleDropdown() {
@@ -107,9 +144,7 @@
                     toggleDropdown();
                 });
             }
-            updateNotificationBell();
-            // Check for new notifications every 30 seconds
-            notificationCheckInterval = setInterval(updateNotificationBell, 30000);
+            startNotifications();
         });
     } else {
         const bell = document.getElementById('notificationBell');
@@ -119,8 +154,7 @@
                 toggleDropdown();
             });
         }
-        updateNotificationBell();
-        notificationCheckInterval = setInterval(updateNotificationBell, 30000);
+        startNotifications();
     }
     
     // Cleanup on page unload
@@ -128,6 +162,9 @@
         if (notificationCheckInterval) {
             clearInterval(notificationCheckInterval);
         }
+        if (notificationStream) {
+            notificationStream.close();
+        }
     });
     
     // Make functions available globally
@@ -0,0 +1,10 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def facet_count(facets, param, value):
+    """' (N)' suffix with the number of offers matching a filter option, or '' if unknown."""
+    count = facets.get('choices', {}).get(param, {}).get(value) if facets else None
+    return '' if count is None else f' ({count})'
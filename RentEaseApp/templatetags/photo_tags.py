@@ -0,0 +1,20 @@
+from django import template
+
+from RentEaseApp.images import VARIANT_SIZES, VARIANT_SRCSETS
+
+register = template.Library()
+
+
+@register.simple_tag
+def photo_src(photo, slot='card', fmt='jpeg'):
+    """URL of the fallback (smallest) derivative for a display slot."""
+    return photo.variant_url(VARIANT_SRCSETS[slot][0], fmt)
+
+
+@register.simple_tag
+def photo_srcset(photo, slot='card', fmt='jpeg'):
+    """srcset value listing the derivatives of a display slot, e.g. '/photos/1/card.webp 640w, ...'."""
+    return ", ".join(
+        f"{photo.variant_url(size, fmt)} {VARIANT_SIZES[size]}w"
+        for size in VARIANT_SRCSETS[slot]
+    )
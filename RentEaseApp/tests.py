@@ -1,7 +1,76 @@
-from django.test import TestCase
-from .models import LandlordUser, TenantUser
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from .images import VARIANT_SIZES, render_variants
+from .offer_filters import OFFER_FILTERS, clean_filter_params, compile_filters, offer_facets
+from .models import LandlordUser, TenantUser, Offer, Photo, PhotoBlob, PhotoVariant, Favorite, Conversation, Message, ContractTemplate, Contract
+from .contracts import compiled_template, generate_contract_from_template
+from .contract_export import contract_archive
+from . import pdf as pdf_module, pdf_render, previews
+from .conversations import recompute_conversation_counters
+from .pagination import ranked_page
+from .photo_storage import create_photo, open_photo, convert_legacy_photos
+from .search import normalize_search_text, offer_search_query, search_rank
 from django.contrib.auth.hashers import make_password, check_password
 
+
+class UserFixtureMixin:
+    """Landlord Jan Wlasciciel and tenant Anna Najemca, created once per test class."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # A plain string is enough where login itself is not tested; hashing costs a lot per test.
+        cls.landlord = LandlordUser.objects.create(
+            email='jan.wlasciciel@example.com', password='x', name='Jan', surname='Wlasciciel'
+        )
+        cls.tenant = TenantUser.objects.create(
+            email='anna.najemca@example.com', password='x', name='Anna', surname='Najemca'
+        )
+
+
+class QueryBudgetMixin:
+    """Assert that a block of code stays within a fixed number of SQL queries."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+        executed = len(queries.captured_queries)
+        if executed > budget:
+            statements = "\n".join(q['sql'] for q in queries.captured_queries)
+            self.fail(f"{executed} queries executed, budget is {budget}:\n{statements}")
+
+    def login(self, user, user_type):
+        session = self.client.session
+        session[f'{user_type}_id'] = user.id
+        session['user_type'] = user_type
+        session.save()
+
+
 class UserModelTest(TestCase):
     def setUp(self):
         # Kod wykonywany przed kazdym testem
@@ -22,4 +91,933 @@ class UserModelTest(TestCase):
     def test_password_hashing(self):
         """Weryfikacja szyfrowania hasla uzytkownika."""
         self.assertNotEqual(self.tenant.password, 'TestPassword123!')
-        self.assertTrue(check_password('TestPassword123!', self.tenant.password))
\ No newline at end of file
+        self.assertTrue(check_password('TestPassword123!', self.tenant.password))
+
+class PhotoEndpointTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        self.content = b'\xff\xd8\xff\xe0fake-jpeg-bytes'
+        self.photo = create_photo(self.offer, self.content, 'image/jpeg')
+
+    def test_serves_decoded_bytes_with_cache_headers(self):
+        """Zdjecie jest zwracane jako bajty z naglowkami cache."""
+        response = self.client.get(reverse('photo', args=[self.photo.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_conditional_request_returns_not_modified(self):
+        """Ponowne zapytanie z If-None-Match zwraca 304."""
+        etag = self.client.get(reverse('photo', args=[self.photo.id]))['ETag']
+        response = self.client.get(reverse('photo', args=[self.photo.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_missing_photo_returns_404(self):
+        response = self.client.get(reverse('photo', args=[self.photo.id + 1000]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_base64_photo_is_still_served(self):
+        """Nieskonwertowane zdjecie base64 nadal jest serwowane."""
+        legacy = Photo.objects.create(offer=self.offer, photo_data=base64.b64encode(b'legacy').decode('utf-8'))
+        response = self.client.get(reverse('photo', args=[legacy.id]))
+        self.assertEqual(b''.join(response.streaming_content), b'legacy')
+
+
+class PhotoStorageTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+
+    def test_identical_uploads_share_one_blob(self):
+        """Identyczne pliki sa przechowywane tylko raz."""
+        first = create_photo(self.offer, b'same-bytes', 'image/png')
+        second = create_photo(self.offer, b'same-bytes', 'image/png')
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(PhotoBlob.objects.count(), 1)
+        self.assertEqual(PhotoBlob.objects.get().sha256, hashlib.sha256(b'same-bytes').hexdigest())
+
+    def test_filesystem_backend_stores_content_addressed_file(self):
+        with tempfile.TemporaryDirectory() as root:
+            with self.settings(PHOTO_STORAGE_BACKEND='filesystem', PHOTO_STORAGE_ROOT=root):
+                photo = create_photo(self.offer, b'file-bytes')
+            sha256 = hashlib.sha256(b'file-bytes').hexdigest()
+            self.assertTrue(os.path.isfile(os.path.join(root, sha256[:2], sha256[2:4], sha256)))
+            self.assertIsNone(PhotoBlob.objects.get(id=photo.blob_id).data)
+            with self.settings(PHOTO_STORAGE_ROOT=root):
+                with open_photo(photo) as f:
+                    self.assertEqual(f.read(), b'file-bytes')
+
+    def test_convert_legacy_photos_is_resumable(self):
+        """Konwersja base64 przetwarza tylko nieskonwertowane wiersze."""
+        for i in range(3):
+            Photo.objects.create(offer=self.offer, photo_data=base64.b64encode(f'photo-{i}'.encode()).decode('utf-8'))
+        self.assertEqual(convert_legacy_photos(Photo, PhotoBlob, batch_size=2), 3)
+        self.assertEqual(convert_legacy_photos(Photo, PhotoBlob, batch_size=2), 0)
+        self.assertFalse(Photo.objects.filter(blob__isnull=True).exists())
+        self.assertFalse(Photo.objects.exclude(photo_data='').exists())
+
+
+def make_jpeg(width, height, exif=True):
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    exif_data = Image.Exif()
+    if exif:
+        exif_data[0x010F] = 'TestCamera'
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif_data.tobytes())
+    return buffer.getvalue()
+
+
+class PhotoVariantTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+
+    def test_render_variants_caps_dimensions_and_strips_exif(self):
+        """Miniatury sa pomniejszone i bez EXIF."""
+        for size, fmt, width, height, content in render_variants(make_jpeg(3000, 1500)):
+            self.assertLessEqual(max(width, height), VARIANT_SIZES[size])
+            image = Image.open(BytesIO(content))
+            self.assertEqual(image.format, 'WEBP' if fmt == 'webp' else 'JPEG')
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_upload_generates_variants_served_by_endpoint(self):
+        photo = create_photo(self.offer, make_jpeg(1600, 1200))
+        self.assertEqual(photo.variants.count(), 6)
+        response = self.client.get(photo.variant_url('card', 'webp'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(Image.open(BytesIO(b''.join(response.streaming_content))).size, (640, 480))
+        response = self.client.get(photo.variant_url('card', 'webp'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_backfill_command_generates_missing_variants(self):
+        """Komenda generuje brakujace miniatury dla istniejacych zdjec."""
+        photo = create_photo(self.offer, make_jpeg(800, 600))
+        photo.variants.all().delete()
+        call_command('generate_photo_variants', workers=1, stdout=StringIO())
+        self.assertEqual(PhotoVariant.objects.filter(photo=photo).count(), 6)
+
+
+class PhotoPayloadDeferralTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        for i in range(5):
+            offer = Offer.objects.create(title=f'Mieszkanie {i}', body='Opis', user=self.landlord)
+            create_photo(offer, f'photo-{i}-a'.encode())
+            create_photo(offer, f'photo-{i}-b'.encode())
+
+    def test_main_site_never_selects_photo_payload(self):
+        """Strona glowna nie pobiera danych zdjec z bazy."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('offers'))
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            self.assertNotIn('"photo_data"', query['sql'])
+            self.assertNotIn('"RentEaseApp_photoblob"."data"', query['sql'])
+
+    def test_payload_is_loaded_only_on_request(self):
+        photo = Photo.objects.first()
+        self.assertIn('photo_data', photo.get_deferred_fields())
+        self.assertNotIn('photo_data', Photo.objects.with_data().first().get_deferred_fields())
+        self.assertIn('data', PhotoBlob.objects.first().get_deferred_fields())
+        with self.assertNumQueries(0):
+            str(photo)
+
+
+class ListingQueryBudgetTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    """Liczba zapytan nie zalezy od liczby ofert, zdjec ani rozmow."""
+
+    def add_offers(self, count):
+        for i in range(count):
+            offer = Offer.objects.create(
+                title=f'Mieszkanie {i}', body='Opis', user=self.landlord, assigned_user=self.tenant,
+                status='Unavailable' if i % 2 else 'Available'
+            )
+            create_photo(offer, f'photo-{i}-a'.encode())
+            create_photo(offer, f'photo-{i}-b'.encode())
+            Favorite.objects.create(tenant=self.tenant, offer=offer)
+            conversation = Conversation.objects.create(offer=offer, landlord=self.landlord, tenant=self.tenant)
+            conversation.add_message('tenant', self.tenant.id, 'Dzien dobry')
+
+    def assertConstantQueries(self, url, user=None, user_type=None, budget=10):
+        if user:
+            self.login(user, user_type)
+        self.add_offers(2)
+        cache.clear()
+        with self.assertQueryBudget(budget) as small:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_offers(15)
+        cache.clear()
+        with self.assertQueryBudget(budget) as large:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_main_site(self):
+        self.assertConstantQueries(reverse('offers'), self.tenant, 'tenant')
+
+    def test_main_site_anonymous(self):
+        self.assertConstantQueries(reverse('offers'))
+
+    def test_my_offers(self):
+        self.assertConstantQueries(reverse('my_offers'), self.landlord, 'landlord')
+
+    def test_favorites_page(self):
+        self.assertConstantQueries(reverse('favorites'), self.tenant, 'tenant')
+
+    def test_profile_tenant(self):
+        self.assertConstantQueries(reverse('profile'), self.tenant, 'tenant')
+
+    def test_profile_landlord(self):
+        self.assertConstantQueries(reverse('profile'), self.landlord, 'landlord')
+
+    def test_conversations_list(self):
+        self.assertConstantQueries(reverse('conversations_list'), self.landlord, 'landlord')
+
+    def test_conversations_list_shows_latest_activity(self):
+        """Lista rozmow pokazuje ostatnia wiadomosc i liczbe nieprzeczytanych."""
+        self.add_offers(2)
+        first, second = Conversation.objects.order_by('id')
+        first.add_message('tenant', self.tenant.id, 'Najnowsza wiadomosc')
+        self.login(self.landlord, 'landlord')
+        response = self.client.get(reverse('conversations_list'))
+        self.assertEqual([c.id for c in response.context['conversations']], [first.id, second.id])
+        self.assertContains(response, 'Najnowsza wiadomosc')
+        self.assertContains(response, '<span class="conversation-unread-badge">2</span>', html=True)
+
+
+class OfferPaginationTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        for i in range(30):
+            Offer.objects.create(title=f'Mieszkanie {i}', body='Opis', user=self.landlord)
+
+    def test_pages_cover_all_offers_once_despite_concurrent_inserts(self):
+        """Kursor jest stabilny mimo dodawania nowych ofert."""
+        response = self.client.get(reverse('offers'))
+        first_page = response.context['offer_ids']
+        self.assertEqual(len(first_page), 24)
+        Offer.objects.create(title='Nowa oferta', body='Opis', user=self.landlord)
+        data = self.client.get(reverse('offers_page'), {'cursor': response.context['next_cursor']}).json()
+        self.assertEqual(data['count'], 6)
+        self.assertIsNone(data['next_cursor'])
+        second_page = [int(offer_id) for offer_id in re.findall(r"offers/(\d+)'", data['html'])]
+        self.assertEqual(len(set(first_page + second_page)), 30)
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(reverse('offers'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(len(response.context['offer_ids']), 24)
+
+
+class OfferFilterCompilerTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        Offer.objects.create(title='A', body='Opis', user=self.landlord, sale_or_rent='Rent', price=2500,
+                             number_of_rooms=2, location='Kraków, Kazimierz', furnished='Yes')
+        Offer.objects.create(title='B', body='Opis', user=self.landlord, sale_or_rent='Rent', price=4000,
+                             number_of_rooms=3, location='Warsaw, Mokotów', furnished='No')
+        Offer.objects.create(title='C', body='Opis', user=self.landlord, sale_or_rent='Sale', price=500000,
+                             number_of_rooms=3, location='Kraków, Podgórze', furnished='Yes')
+        Offer.objects.create(title='D', body='Opis', user=self.landlord, sale_or_rent='Rent', price=2000,
+                             status='Unavailable')
+
+    def search(self, **params):
+        response = self.client.get(reverse('offers'), params)
+        return sorted(Offer.objects.filter(pk__in=response.context['offer_ids']).values_list('title', flat=True))
+
+    def test_filter_spec_is_derived_from_model_fields(self):
+        params = {param for offer_filter in OFFER_FILTERS for param in offer_filter.params}
+        self.assertTrue({'price_from', 'rooms_to', 'rental_period_from', 'heating', 'location'} <= params)
+        self.assertNotIn('status', params)
+
+    def test_filters_combine_into_one_query(self):
+        """Filtry zakresowe, wyboru i tekstowe sa laczone w jedno zapytanie."""
+        self.assertEqual(self.search(sale_or_rent='Rent'), ['A', 'B'])
+        self.assertEqual(self.search(price_from='2400', price_to='4000'), ['A', 'B'])
+        self.assertEqual(self.search(rooms_from='3', location='kraków'), ['C'])
+        self.assertEqual(self.search(furnished='Yes', price_to='abc'), ['A', 'C'])
+
+    def test_planner_uses_partial_search_index(self):
+        """EXPLAIN pokazuje uzycie indeksu czesciowego."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE "RentEaseApp_offer"')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        queryset = Offer.objects.exclude(status='Unavailable').filter(
+            compile_filters(clean_filter_params({'sale_or_rent': 'Rent', 'price_from': '1000'}))
+        )
+        # On a table this small any of the (sale_or_rent, ...) partial indexes is a valid pick.
+        self.assertRegex(queryset.explain(), r'offer_listed_type_\w+_idx')
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_sort = off')
+        recent = Offer.objects.exclude(status='Unavailable').order_by('-created_at', '-id')[:24]
+        self.assertIn('offer_listed_recent_idx', recent.explain())
+
+
+class OfferFacetTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        for price, furnished, area in ((1500, 'Yes', 40), (2500, 'Yes', 60), (2800, 'No', 60), (600000, 'Partially', 120)):
+            Offer.objects.create(title='Oferta', body='Opis', user=self.landlord, price=price,
+                                 furnished=furnished, area=area,
+                                 sale_or_rent='Sale' if price > 100000 else 'Rent')
+        Offer.objects.create(title='Niedostepna', body='Opis', user=self.landlord, price=2000,
+                             furnished='Yes', status='Unavailable')
+
+    def test_facets_are_computed_in_one_query(self):
+        """Wszystkie liczniki facet sa liczone jednym zapytaniem."""
+        with CaptureQueriesContext(connection) as queries:
+            facets = offer_facets(clean_filter_params({'sale_or_rent': 'Rent'}))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(facets['choices']['furnished'], {'Yes': 2, 'No': 1, 'Partially': 0})
+        # The active filter does not restrict its own facet.
+        self.assertEqual(facets['choices']['sale_or_rent'], {'Sale': 1, 'Rent': 3})
+        area = {bucket['from']: bucket['count'] for bucket in facets['ranges']['area']}
+        self.assertEqual((area[30], area[50], area[100]), (1, 2, 0))
+
+    def test_facets_are_cached_per_filter_signature(self):
+        """Powtorne zapytanie z tymi samymi filtrami korzysta z cache."""
+        offer_facets(clean_filter_params({'furnished': 'Yes', 'price_to': '3000'}))
+        with CaptureQueriesContext(connection) as queries:
+            facets = offer_facets(clean_filter_params({'price_to': '3000', 'furnished': 'Yes', 'heating': ''}))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(facets['total'], 2)
+
+    def test_main_site_shows_option_counts(self):
+        response = self.client.get(reverse('offers'), {'furnished': 'Yes'})
+        self.assertContains(response, 'Partially (1)</option>')
+        self.assertContains(response, 'class="facet-histogram"')
+
+
+class OfferSearchTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        self.lodz = Offer.objects.create(title='Mieszkanie w centrum', body='Blisko Piotrkowskiej',
+                                         user=self.landlord, location='Łódź, Śródmieście')
+        self.krakow = Offer.objects.create(title='Kawalerka Łódź Widzew', body='Cicha okolica',
+                                           user=self.landlord, location='Kraków')
+        self.other = Offer.objects.create(title='Dom z ogrodem', body='Duzy ogrod, blisko Łodzi',
+                                          user=self.landlord, location='Zgierz')
+
+    def test_normalize_search_text(self):
+        self.assertEqual(normalize_search_text('  ŁÓDŹ,  Śródmieście '), 'lodz, srodmiescie')
+        self.assertEqual(normalize_search_text(None), '')
+
+    def test_search_vector_is_maintained_on_save(self):
+        """Wektor wyszukiwania jest aktualizowany przy zapisie oferty."""
+        self.other.title = 'Dom w Łodzi'
+        self.other.save(update_fields=['title'])
+        self.assertEqual(Offer.objects.filter(search_vector=offer_search_query('lodzi dom')).get(), self.other)
+        self.assertEqual(Offer.objects.get(pk=self.lodz.pk).search_location, 'lodz, srodmiescie')
+
+    def test_search_is_accent_insensitive_and_ranked(self):
+        """Wyszukiwanie ignoruje polskie znaki i sortuje po trafnosci."""
+        response = self.client.get(reverse('offers'), {'q': 'Lodz'})
+        # Title matches (weight A) rank above location (B) and body (C); "Łodzi" matches the "lodz" prefix.
+        self.assertEqual(response.context['offer_ids'], [self.krakow.pk, self.lodz.pk, self.other.pk])
+        response = self.client.get(reverse('offers'), {'location': 'LODZ'})
+        self.assertEqual(response.context['offer_ids'], [self.lodz.pk])
+
+    def test_ranked_results_paginate_with_cursor(self):
+        for i in range(5):
+            Offer.objects.create(title=f'Oferta {i}', body='Mieszkanie', user=self.landlord)
+        seen = []
+        cursor = ''
+        while True:
+            items, cursor = ranked_page(
+                Offer.objects.filter(search_vector=offer_search_query('mieszkanie'))
+                .annotate(rank=search_rank(offer_search_query('mieszkanie'))), cursor, 2
+            )
+            seen.extend(offer.pk for offer in items)
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+
+
+class ListingCacheTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord, price=2500)
+
+    def test_anonymous_listing_is_served_from_cache(self):
+        """Powtorne anonimowe wyszukiwanie nie odpytuje bazy o oferty."""
+        self.client.get(reverse('offers'), {'price_from': '2000'})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('offers'), {'price_from': '2000', 'heating': ''})
+        self.assertEqual(len(queries), 0)
+        self.assertContains(response, 'Mieszkanie')
+
+    def test_offer_and_photo_changes_invalidate_cached_pages(self):
+        """Zapis oferty lub zdjecia uniewaznia zapisane strony."""
+        self.client.get(reverse('offers'))
+        self.offer.title = 'Dom z ogrodem'
+        self.offer.save()
+        self.assertContains(self.client.get(reverse('offers')), 'Dom z ogrodem')
+        with self.captureOnCommitCallbacks(execute=True):
+            photo = create_photo(self.offer, make_jpeg(50, 40))
+        self.assertContains(self.client.get(reverse('offers')), photo.variant_url('card', 'jpeg'))
+        Offer.objects.get(pk=self.offer.pk).delete()
+        self.assertContains(self.client.get(reverse('offers')), 'No Results Found')
+
+    def test_tenant_pages_are_not_shared(self):
+        Favorite.objects.create(tenant=self.tenant, offer=self.offer)
+        self.client.get(reverse('offers'))
+        self.login(self.tenant, 'tenant')
+        self.assertContains(self.client.get(reverse('offers')), 'data-is-favorite="true"')
+
+
+class NotificationQueryTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def add_conversations(self, count):
+        offers = Offer.objects.bulk_create(
+            Offer(title=f'Mieszkanie {i}', body='Opis', user=self.landlord) for i in range(count)
+        )
+        conversations = Conversation.objects.bulk_create(
+            Conversation(offer=offer, landlord=self.landlord, tenant=self.tenant) for offer in offers
+        )
+        messages = Message.objects.bulk_create(
+            message
+            for conversation in conversations
+            for message in (
+                Message(conversation=conversation, sender_id=self.tenant.id, sender_type='tenant',
+                        content='Przeczytana'),
+                Message(conversation=conversation, sender_id=self.landlord.id, sender_type='landlord',
+                        content='Odpowiedz'),
+                Message(conversation=conversation, sender_id=self.tenant.id, sender_type='tenant',
+                        content='Czy mieszkanie jest nadal dostepne? ' * 3),
+            )
+        )
+        for conversation, read in zip(conversations, messages[::3]):
+            conversation.last_read_by_landlord = read.id
+        Conversation.objects.bulk_update(conversations, ['last_read_by_landlord'])
+        recompute_conversation_counters(Conversation, Message)
+
+    def test_query_count_is_constant_for_500_conversations(self):
+        """Liczba zapytan o powiadomienia nie zalezy od liczby rozmow."""
+        self.login(self.landlord, 'landlord')
+        self.add_conversations(5)
+        cache.clear()
+        with self.assertQueryBudget(4) as small:
+            self.assertEqual(self.client.get(reverse('get_notifications')).json()['unread_count'], 5)
+        self.add_conversations(495)
+        cache.clear()
+        with self.assertQueryBudget(4) as large:
+            data = self.client.get(reverse('get_notifications')).json()
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(data['unread_count'], 500)
+        self.assertEqual(len(data['notifications']), 500)
+        notification = data['notifications'][0]
+        self.assertEqual(notification['tenant_name'], 'Anna Najemca')
+        self.assertEqual(notification['unread_count'], 1)
+        self.assertEqual(notification['latest_message'], ('Czy mieszkanie jest nadal dostepne? ' * 3)[:50])
+
+    def test_tenant_sees_unread_landlord_messages(self):
+        self.add_conversations(2)
+        self.login(self.tenant, 'tenant')
+        data = self.client.get(reverse('get_notifications')).json()
+        self.assertEqual(data['unread_count'], 2)
+        self.assertEqual(data['notifications'][0]['landlord_name'], 'Jan Wlasciciel')
+        self.assertEqual(data['notifications'][0]['unread_count'], 1)
+
+    def test_own_reply_is_not_shown_as_notification(self):
+        """Wlasna wiadomosc czytelnika nie zastepuje tresci nieprzeczytanej wiadomosci w powiadomieniu."""
+        offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        conversation = Conversation.objects.create(offer=offer, landlord=self.landlord, tenant=self.tenant)
+        conversation.add_message('landlord', self.landlord.id, 'Prosze podpisac umowe')
+        conversation.add_message('tenant', self.tenant.id, 'Umowa podpisana')
+        self.login(self.tenant, 'tenant')
+        data = self.client.get(reverse('get_notifications')).json()
+        self.assertEqual(data['unread_count'], 1)
+        self.assertEqual(data['notifications'][0]['latest_message'], 'Prosze podpisac umowe')
+
+
+class ConversationCounterTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        self.conversation = Conversation.objects.create(offer=offer, landlord=self.landlord, tenant=self.tenant)
+
+    def test_add_message_and_mark_read_maintain_counters(self):
+        """Liczniki nieprzeczytanych wiadomosci sa aktualizowane razem z wiadomosciami."""
+        self.conversation.add_message('tenant', self.tenant.id, 'Dzien dobry')
+        self.conversation.add_message('tenant', self.tenant.id, 'Czy oferta jest aktualna?')
+        self.conversation.add_message('landlord', self.landlord.id, 'Tak')
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.unread_for_landlord, self.conversation.unread_for_tenant), (2, 1))
+        self.assertEqual(self.conversation.last_message_preview, 'Tak')
+        self.assertEqual(self.conversation.last_message_at, self.conversation.messages.latest('created_at').created_at)
+
+        self.conversation.mark_read('landlord')
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.unread_for_landlord, self.conversation.unread_for_tenant), (0, 1))
+        self.assertEqual(self.conversation.last_read_by_landlord, self.conversation.messages.latest('id').id)
+
+    def test_mark_read_is_single_row_update(self):
+        """Oznaczenie jako przeczytane to jedna aktualizacja rozmowy, bez zapisu wiadomosci."""
+        for i in range(20):
+            self.conversation.add_message('tenant', self.tenant.id, f'Wiadomosc {i}')
+        with CaptureQueriesContext(connection) as queries:
+            self.conversation.mark_read('landlord')
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertIn('UPDATE "RentEaseApp_conversation"', queries.captured_queries[0]['sql'])
+        with CaptureQueriesContext(connection) as queries:
+            self.conversation.mark_read('landlord')
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_for_landlord, 0)
+
+    def test_mark_read_clears_message_committed_out_of_order(self):
+        """Wiadomosc zatwierdzona po nowszej (nizsze id) nie zostawia licznika nieprzeczytanych."""
+        late = Message.objects.create(conversation=self.conversation, sender_id=self.tenant.id,
+                                      sender_type='tenant', content='Wolniejsza')
+        self.conversation.add_message('tenant', self.tenant.id, 'Szybsza')
+        self.conversation.mark_read('landlord')
+        # The slower sender's transaction now runs its counter update for the older message.
+        with mock.patch.object(Message.objects, 'create', return_value=late):
+            self.conversation.add_message('tenant', self.tenant.id, late.content)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_for_landlord, 1)
+        self.assertEqual(self.conversation.last_read_by_landlord, self.conversation.last_message_id)
+
+        self.conversation.mark_read('landlord')
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.unread_for_landlord, 0)
+
+    def test_repair_command_recomputes_counters(self):
+        """Komenda naprawcza przelicza liczniki z tabeli wiadomosci."""
+        self.conversation.add_message('tenant', self.tenant.id, 'Dzien dobry')
+        Message.objects.create(conversation=self.conversation, sender_id=self.tenant.id, sender_type='tenant',
+                               content='Wiadomosc dodana z pominieciem licznikow ' * 5)
+        Conversation.objects.update(unread_for_tenant=7)
+        call_command('repair_conversation_counters', stdout=StringIO())
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.unread_for_landlord, self.conversation.unread_for_tenant), (2, 0))
+        self.assertEqual(self.conversation.last_message_preview, ('Wiadomosc dodana z pominieciem licznikow ' * 5)[:100])
+
+
+@override_settings(NOTIFICATION_BROKER='memory')
+class NotificationStreamTest(UserFixtureMixin, TestCase):
+    def setUp(self):
+        offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        self.conversation = Conversation.objects.create(offer=offer, landlord=self.landlord, tenant=self.tenant)
+        session = SessionStore()
+        session['landlord_id'] = self.landlord.id
+        session['user_type'] = 'landlord'
+        session.save()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def send_from_tenant(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.add_message('tenant', self.tenant.id, content)
+
+    async def test_stream_pushes_payload_on_new_message(self):
+        """Nowa wiadomosc jest wypychana do otwartego strumienia bez odpytywania."""
+        response = await self.async_client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+        self.assertIn(b'retry:', await anext(chunks))
+        self.assertIn(b'"unread_count": 0', await anext(chunks))
+
+        await sync_to_async(self.send_from_tenant)('Dzien dobry')
+        pushed = (await asyncio.wait_for(anext(chunks), 5)).decode()
+        self.assertTrue(pushed.startswith('event: notifications\n'))
+        self.assertIn('"unread_count": 1', pushed)
+        self.assertIn('Dzien dobry', pushed)
+
+    def test_stream_is_refused_without_asgi(self):
+        """Bez serwera ASGI strumien odpowiada 204, a strona wraca do odpytywania."""
+        self.client.cookies = self.async_client.cookies
+        self.assertEqual(self.client.get(reverse('notification_stream')).status_code, 204)
+
+
+class MessageHistoryTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        self.conversation = Conversation.objects.create(offer=offer, landlord=self.landlord, tenant=self.tenant)
+        Message.objects.bulk_create(
+            Message(conversation=self.conversation, sender_id=self.tenant.id, sender_type='tenant',
+                    content=f'Wiadomosc nr {i:03d}')
+            for i in range(120)
+        )
+
+    def test_detail_renders_latest_page_and_history_loads_by_cursor(self):
+        """Widok rozmowy pokazuje ostatnie wiadomosci, starsze sa doladowywane kursorem."""
+        self.login(self.landlord, 'landlord')
+        response = self.client.get(reverse('conversation_detail', args=[self.conversation.id]))
+        shown = [message.content for message in response.context['messages']]
+        self.assertEqual(shown, [f'Wiadomosc nr {i:03d}' for i in range(70, 120)])
+
+        cursor = response.context['older_cursor']
+        url = reverse('conversation_messages', args=[self.conversation.id])
+        while cursor:
+            with self.assertQueryBudget(6):
+                data = self.client.get(url, {'cursor': cursor}).json()
+            shown = re.findall(r'Wiadomosc nr \d{3}', data['html']) + shown
+            cursor = data['next_cursor']
+        self.assertEqual(shown, [f'Wiadomosc nr {i:03d}' for i in range(120)])
+
+    def test_history_requires_participant(self):
+        other = TenantUser.objects.create(email='obcy@example.com', password='x', name='Obcy', surname='Najemca')
+        self.login(other, 'tenant')
+        response = self.client.get(reverse('conversation_messages', args=[self.conversation.id]))
+        self.assertEqual(response.status_code, 403)
+
+
+class CurrentUserTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.login(self.landlord, 'landlord')
+
+    def user_queries(self, queries):
+        return [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'FROM "RentEaseApp_landlorduser"' in q['sql']]
+
+    def test_user_is_loaded_once_and_then_cached(self):
+        """Zalogowany uzytkownik jest pobierany raz na zadanie, a potem z pamieci podrecznej."""
+        with self.assertQueryBudget(20) as queries:
+            self.client.get(reverse('profile'))
+        self.assertEqual(len(self.user_queries(queries)), 1)
+        with self.assertQueryBudget(20) as queries:
+            self.client.get(reverse('profile'))
+        self.assertEqual(self.user_queries(queries), [])
+
+    def test_profile_update_invalidates_cached_user(self):
+        """Zapis profilu usuwa uzytkownika z pamieci podrecznej."""
+        self.client.get(reverse('profile'))
+        self.client.post(reverse('profile'), {
+            'name': 'Janusz', 'surname': 'Wlasciciel', 'email': 'jan.wlasciciel@example.com',
+        })
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.context['user'].name, 'Janusz')
+
+
+class LoginTest(TestCase):
+    def setUp(self):
+        self.tenant = TenantUser.objects.create(
+            email='anna.najemca@example.com',
+            password=make_password('TestPassword123!'),
+            name='Anna',
+            surname='Najemca'
+        )
+
+    def test_tenant_login_is_single_account_lookup(self):
+        """Logowanie najemcy to jedno zapytanie o konto, bez sprawdzania tabeli wynajmujacych."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('login'), {
+                'email': 'anna.najemca@example.com', 'password': 'TestPassword123!',
+            })
+        self.assertRedirects(response, reverse('offers'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['tenant_id'], self.tenant.id)
+        user_queries = [q['sql'] for q in queries.captured_queries if 'user' in q['sql'].lower() or 'account' in q['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertIn('"RentEaseApp_account"', user_queries[0])
+
+    def test_wrong_password_is_rejected(self):
+        response = self.client.post(reverse('login'), {'email': 'anna.najemca@example.com', 'password': 'zle'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('tenant_id', self.client.session)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_login_upgrades_hash_to_configured_iterations(self):
+        """Haslo jest przeliczane przy logowaniu, gdy zmieni sie liczba iteracji."""
+        self.client.post(reverse('login'), {'email': 'anna.najemca@example.com', 'password': 'TestPassword123!'})
+        self.tenant.refresh_from_db()
+        self.assertTrue(self.tenant.password.startswith('pbkdf2_sha256$1000$'))
+
+
+class ContractTemplateTest(TestCase):
+    def setUp(self):
+        self.landlord = LandlordUser.objects.create(
+            email='jan.wlasciciel@example.com', password='x', name='Jan', surname='Wlasciciel',
+            bank_account_number='PL 12 3456'
+        )
+        self.tenant = TenantUser.objects.create(
+            email='anna.najemca@example.com', password='x', name='Anna', surname='Najemca', pesel='90010112345'
+        )
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord,
+                                          location='Krakow', price=3255)
+
+    def test_all_placeholder_syntaxes_are_filled(self):
+        """Szablon tekstowy wypelnia {{pole}}, **Etykieta** i {{Etykieta}}."""
+        template = ContractTemplate.objects.create(landlord=self.landlord, template_content=(
+            'Najemca: {{tenant_full_name}} ({{Tenant Name PESEL}}), konto: **Bank Account**, '
+            'lokal: {{Location}}, czynsz: **Price** zl, {{Description}} {{nieznane}}'
+        ))
+        self.assertEqual(
+            generate_contract_from_template(template, self.offer, self.tenant, self.landlord),
+            'Najemca: Anna Najemca (Anna Najemca 90010112345), konto: PL 12 3456, '
+            'lokal: Krakow, czynsz: 3 255 zl, {{Description}} {{nieznane}}'
+        )
+
+    def test_structure_blocks_are_filled(self):
+        template = ContractTemplate.objects.create(landlord=self.landlord, template_content='', template_structure=[
+            {'type': 'text', 'content': 'Tytul: '},
+            {'type': 'block', 'field_name': 'Property Title'},
+            {'type': 'text', 'content': ', wynajmujacy: '},
+            {'type': 'block', 'field_name': 'landlord_full_name'},
+        ])
+        self.assertEqual(
+            generate_contract_from_template(template, self.offer, self.tenant, self.landlord),
+            'Tytul: Mieszkanie, wynajmujacy: Jan Wlasciciel'
+        )
+
+    def test_compiled_template_is_reused_until_edited(self):
+        """Skompilowany szablon jest uzywany ponownie, a po edycji kompilowany od nowa."""
+        template = ContractTemplate.objects.create(landlord=self.landlord, template_content='{{tenant_name}}')
+        self.assertIs(compiled_template(template), compiled_template(ContractTemplate.objects.get(id=template.id)))
+        template.template_content = 'Pan/Pani {{tenant_surname}}'
+        template.save()
+        self.assertEqual(
+            generate_contract_from_template(template, self.offer, self.tenant, self.landlord), 'Pan/Pani Najemca'
+        )
+
+
+class ContractPreviewTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord, location='Krakow')
+        self.login(self.landlord, 'landlord')
+        self.structure = [
+            {'type': 'text', 'content': 'Wynajmujacy: '},
+            {'type': 'block', 'field_name': 'landlord_full_name', 'label': 'Full Name'},
+            {'type': 'text', 'content': ', najemca: '},
+            {'type': 'block', 'field_name': 'tenant_full_name', 'label': 'Full Name'},
+        ]
+
+    def preview(self, **data):
+        return self.client.post(reverse('preview_contract'), {'offer_id': self.offer.id, **data})
+
+    def test_contract_creator_page_renders(self):
+        """Kreator szablonu umowy wyswietla sie z lista pol do wstawienia."""
+        response = self.client.get(reverse('create_contract'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'landlord_full_name')
+
+    def test_changes_are_applied_to_stored_version(self):
+        """Edytor wysyla tylko zmiany wzgledem zapamietanej wersji szablonu."""
+        first = self.preview(template_structure=json.dumps(self.structure)).json()
+        self.assertEqual(first['preview_content'], 'Wynajmujacy: Jan Wlasciciel, najemca: [Full Name]')
+
+        changes = [{'at': 2, 'remove': 1, 'insert': [
+            {'type': 'text', 'content': ', lokal: '}, {'type': 'block', 'field_name': 'property_location'},
+        ]}]
+        second = self.preview(base_version=first['version'], changes=json.dumps(changes)).json()
+        self.assertEqual(second['preview_content'], 'Wynajmujacy: Jan Wlasciciel, lokal: Krakow[Full Name]')
+        full = self.structure[:2] + changes[0]['insert'] + self.structure[3:]
+        self.assertEqual(self.preview(template_structure=json.dumps(full)).json()['version'], second['version'])
+
+        self.assertEqual(self.preview(base_version=first['version'], changes='[{"at": 9}]').status_code, 400)
+        malformed = '[{"at": 1, "remove": 0, "insert": [{"type": "block", "field_name": 5}]}]'
+        self.assertEqual(self.preview(base_version=first['version'], changes=malformed).status_code, 400)
+        expired = self.preview(base_version='0' * 64, changes='[]')
+        self.assertEqual(expired.status_code, 409)
+        self.assertTrue(expired.json()['resync'])
+
+    def test_preview_is_rendered_once_and_revalidated_by_etag(self):
+        """Podglad jest renderowany raz dla wersji i danych, a GET z If-None-Match dostaje 304."""
+        with mock.patch('RentEaseApp.previews._render', wraps=previews._render) as render:
+            first = self.preview(template_content='{{landlord_name}} **Location** {{tenant_name}}')
+            again = self.preview(template_content='{{landlord_name}} **Location** {{tenant_name}}')
+        render.assert_called_once()
+        self.assertEqual(again.json()['preview_content'], 'Jan Krakow [Tenant Name]')
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        url = first.json()['preview_url']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        Offer.objects.filter(pk=self.offer.pk).update(location='Gdansk')
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()['preview_content'], 'Jan Gdansk [Tenant Name]')
+
+
+@override_settings(PDF_RENDER_EXECUTOR='inline')
+class ContractPdfTest(UserFixtureMixin, QueryBudgetMixin, TestCase):
+    def setUp(self):
+        offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        template = ContractTemplate.objects.create(landlord=self.landlord, template_content='Najemca: {{tenant_full_name}}')
+        self.contract = Contract.objects.create(offer=offer, tenant=self.tenant, landlord=self.landlord, template=template)
+        self.url = reverse('download_contract_pdf', args=[self.contract.id])
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.cache_root = root.name
+        self.enterContext(self.settings(CONTRACT_PDF_CACHE_ROOT=root.name))
+
+    def cached_files(self):
+        return sorted(
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(self.cache_root) for name in names
+        )
+
+    def test_pdf_is_rendered_once_and_revalidated_by_etag(self):
+        """PDF umowy jest renderowany raz, kolejne pobrania czytaja plik lub dostaja 304."""
+        self.login(self.tenant, 'tenant')
+        response = self.client.get(self.url)
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertIn('attachment', response['Content-Disposition'])
+        etag = response['ETag']
+        self.assertEqual(len(self.cached_files()), 1)
+
+        again = self.client.get(self.url)
+        self.assertEqual(b''.join(again.streaming_content), pdf)
+        self.assertEqual(again['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_signing_invalidates_cached_pdf(self):
+        """Podpisanie umowy usuwa zapisany PDF i zmienia ETag."""
+        self.login(self.tenant, 'tenant')
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('sign_contract', args=[self.contract.id, 'tenant']))
+        self.assertEqual(self.cached_files(), [])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_other_tenant_cannot_download(self):
+        other = TenantUser.objects.create(email='obcy@example.com', password='x', name='Obcy', surname='Najemca')
+        self.login(other, 'tenant')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_identical_contracts_get_their_own_pdfs(self):
+        """Dwie umowy o identycznej tresci maja osobne pliki PDF."""
+        twin_offer = Offer.objects.create(title='Mieszkanie', body='Opis', user=self.landlord)
+        twin = Contract.objects.create(offer=twin_offer, tenant=self.tenant, landlord=self.landlord,
+                                       template=self.contract.template)
+        Contract.objects.filter(pk=twin.pk).update(created_at=self.contract.created_at)
+        self.login(self.tenant, 'tenant')
+        for contract_id in (self.contract.id, twin.id):
+            response = self.client.get(reverse('download_contract_pdf', args=[contract_id]))
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_pdf_written_concurrently_is_served(self):
+        """PDF zapisany przez workera w trakcie zadania jest zwracany od razu."""
+        self.login(self.tenant, 'tenant')
+
+        def written_meanwhile(contract_id, inputs, key):
+            pdf_module.store_pdf(contract_id, key, pdf_module.render_contract_pdf(inputs))
+            return None
+
+        with mock.patch('RentEaseApp.views.request_pdf', side_effect=written_meanwhile):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_fonts_are_registered_once_per_process(self):
+        """Czcionki i style PDF sa przygotowywane raz, a nie przy kazdym renderowaniu."""
+        inputs = pdf_module.contract_pdf_inputs(self.contract)
+        renderer = pdf_module.contract_pdf_renderer()
+        with mock.patch.object(pdf_render, 'register_pdf_fonts') as register:
+            self.assertTrue(pdf_module.render_contract_pdf(inputs).startswith(b'%PDF'))
+            self.assertTrue(pdf_module.render_contract_pdf(inputs).startswith(b'%PDF'))
+        register.assert_not_called()
+        self.assertIs(pdf_module.contract_pdf_renderer(), renderer)
+
+    @override_settings(PDF_RENDER_EXECUTOR='worker')
+    def test_worker_renders_queued_pdf(self):
+        """Przy renderowaniu w tle pobranie zwraca 202, a plik jest gotowy po pracy workera."""
+        self.login(self.tenant, 'tenant')
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual(job['status'], 'pending')
+        self.assertEqual(self.client.get(self.url).status_code, 202)
+
+        call_command('run_pdf_worker', '--once', '--workers', '1', stdout=StringIO())
+        self.assertEqual(self.client.get(job['status_url']).json()['status'], 'done')
+        response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def export(self, *contract_ids):
+        response = self.client.get(reverse('export_contracts_zip'), {'contract': contract_ids})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        return zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+
+    def test_export_zip_reuses_cached_pdfs(self):
+        """Eksport ZIP zawiera wybrane umowy wlasciciela i uzywa juz wyrenderowanych PDF."""
+        other_tenant = TenantUser.objects.create(email='piotr@example.com', password='x', name='Piotr', surname='Nowak')
+        second = Contract.objects.create(offer=self.contract.offer, tenant=other_tenant, landlord=self.landlord,
+                                         template=self.contract.template)
+        stranger = LandlordUser.objects.create(email='obcy@example.com', password='x', name='Obcy', surname='X')
+        foreign = Contract.objects.create(offer=Offer.objects.create(title='Cudze', body='Opis', user=stranger),
+                                          tenant=other_tenant, landlord=stranger)
+        self.login(self.landlord, 'landlord')
+        cached = b''.join(self.client.get(self.url).streaming_content)
+
+        with mock.patch('RentEaseApp.pdf_jobs.render_contract_pdf', wraps=pdf_module.render_contract_pdf) as render:
+            archive = self.export(self.contract.id, second.id, foreign.id)
+        render.assert_called_once()
+        self.assertEqual(sorted(archive.namelist()), [
+            f'contract_Mieszkanie_{self.contract.id}.pdf', f'contract_Mieszkanie_{second.id}.pdf',
+        ])
+        self.assertEqual(archive.read(f'contract_Mieszkanie_{self.contract.id}.pdf'), cached)
+        self.assertTrue(archive.read(f'contract_Mieszkanie_{second.id}.pdf').startswith(b'%PDF'))
+
+        with mock.patch('RentEaseApp.pdf_jobs.render_contract_pdf', side_effect=RuntimeError('brak czcionek')):
+            TenantUser.objects.filter(pk=other_tenant.pk).update(surname='Zmieniony')
+            archive = self.export()
+        self.assertEqual(sorted(archive.namelist()), sorted([f'contract_Mieszkanie_{self.contract.id}.pdf', 'errors.txt']))
+        self.assertIn('brak czcionek', archive.read('errors.txt').decode())
+
+    @override_settings(PDF_RENDER_EXECUTOR='worker')
+    def test_export_zip_does_not_wait_for_busy_workers(self):
+        """Przy zajetych workerach eksport nie czeka, tylko wymienia niegotowe umowy w errors.txt."""
+        other_tenant = TenantUser.objects.create(email='piotr@example.com', password='x', name='Piotr', surname='Nowak')
+        second = Contract.objects.create(offer=self.contract.offer, tenant=other_tenant, landlord=self.landlord,
+                                         template=self.contract.template)
+        self.login(self.landlord, 'landlord')
+        with mock.patch('RentEaseApp.contract_export.EXPORT_JOB_WAIT', 0.1):
+            started = time.monotonic()
+            archive = self.export()
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(archive.namelist(), ['errors.txt'])
+        errors = archive.read('errors.txt').decode()
+        self.assertIn(f'_{self.contract.id}.pdf: still being rendered', errors)
+        self.assertIn(f'_{second.id}.pdf: still being rendered', errors)
+
+    def login_async_client(self, user, user_type):
+        session = SessionStore()
+        session[f'{user_type}_id'] = user.id
+        session['user_type'] = user_type
+        session.save()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    async def test_export_zip_streams_under_asgi(self):
+        """Pod ASGI pierwszy kawalek ZIP jest wysylany, zanim archiwum zostanie zbudowane w calosci."""
+        await sync_to_async(self.login_async_client)(self.landlord, 'landlord')
+        finished = []
+
+        def archive(contracts):
+            yield from contract_archive(contracts)
+            finished.append(True)
+
+        with mock.patch('RentEaseApp.views.contract_archive', archive):
+            response = await self.async_client.get(reverse('export_contracts_zip'))
+            self.assertTrue(response.is_async)
+            chunks = aiter(response.streaming_content)
+            first = await anext(chunks)
+            self.assertEqual(finished, [])
+            content = first + b''.join([chunk async for chunk in chunks])
+        self.assertEqual(finished, [True])
+        self.assertEqual(zipfile.ZipFile(BytesIO(content)).namelist(), [f'contract_Mieszkanie_{self.contract.id}.pdf'])
+
+
+class StartupImportTest(SimpleTestCase):
+    # Cumulative import time of the WSGI app with its URLconf; generous, it guards
+    # against heavy modules (ReportLab took ~0.25 s alone) creeping back in.
+    IMPORT_BUDGET_US = 3_000_000
+
+    def test_wsgi_startup_does_not_import_reportlab(self):
+        """Start aplikacji WSGI nie laduje ReportLab i miesci sie w budzecie czasu importu."""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import RentEase.wsgi, RentEaseApp.urls'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'RentEase.settings'},
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        # Lines look like "import time:   self [us] | cumulative | module".
+        timings = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, module = line.split('|')
+                if cumulative.strip().isdigit():
+                    timings[module.strip()] = int(cumulative)
+        self.assertIn('RentEaseApp.views', timings)
+        self.assertFalse([module for module in timings if module.startswith('reportlab')])
+        self.assertLess(timings['RentEase.wsgi'] + timings['RentEaseApp.urls'], self.IMPORT_BUDGET_US)
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('', views.mainSite, name="offers"),
+    path('offers/page', views.offers_page, name="offers_page"),
     path('login', views.loginPanel, name="login"),
     path('register', views.registerPanel, name="register"),
     path('logout', views.logout, name="logout"),
@@ -11,14 +12,18 @@ urlpatterns = [
     path('offers/<int:offer_id>', views.offer_detail, name="offer_detail"),
     path('offers/<int:offer_id>/edit', views.edit_offer, name="edit_offer"),
     path('offers/<int:offer_id>/delete', views.delete_offer, name="delete_offer"),
+    path('photos/<int:photo_id>', views.photo, name="photo"),
+    path('photos/<int:photo_id>/<str:size>.<str:fmt>', views.photo_variant, name="photo_variant"),
     path('profile', views.profile, name="profile"),
     path('profile', views.profile, name="profile"),
     path('conversations', views.conversations_list, name="conversations_list"),
     path('conversations/<int:conversation_id>', views.conversation_detail, name="conversation_detail"),
+    path('conversations/<int:conversation_id>/messages', views.conversation_messages, name="conversation_messages"),
     path('conversations/offer/<int:offer_id>', views.conversation_detail_from_offer, name="conversation_detail_from_offer"),
     path('offers/<int:offer_id>/start-conversation', views.create_conversation, name="create_conversation"),
     path('conversations/<int:conversation_id>/finalize', views.assign_tenant_to_offer, name="assign_tenant_to_offer"),
     path('notifications', views.get_notifications, name="get_notifications"),
+    path('notifications/stream', views.notification_stream, name="notification_stream"),
     path('conversations/<int:conversation_id>/mark-read', views.mark_messages_as_read, name="mark_messages_as_read"),
     path('api/favorites/<int:offer_id>', views.toggle_favorite, name="toggle_favorite"),
     path('api/favorites', views.get_favorites, name="get_favorites"),
@@ -31,9 +36,13 @@ urlpatterns = [
     path('contracts/view/<int:contract_id>', views.view_contract, name="view_contract"),
     path('contracts/view/<int:contract_id>/landlord', views.view_contract_landlord, name="view_contract_landlord"),
     path('contracts/download/<int:contract_id>/pdf', views.download_contract_pdf, name="download_contract_pdf"),
+    path('contracts/export.zip', views.export_contracts_zip, name="export_contracts_zip"),
     path('contracts/sign/<int:contract_id>/<str:signer_type>', views.sign_contract, name="sign_contract"),
     path('api/contracts/preview', views.preview_contract, name="preview_contract"),
+    path('api/contracts/preview/<str:version>', views.contract_preview, name="contract_preview"),
     path('api/contracts/preview-pdf', views.preview_contract_pdf, name="preview_contract_pdf"),
+    path('api/pdf-jobs/<str:key>', views.pdf_job_status, name="pdf_job_status"),
+    path('api/pdf-jobs/<str:key>/file', views.pdf_job_file, name="pdf_job_file"),
     path('conversations/<int:conversation_id>/rent', views.rent_finalize, name="rent_finalize"),
     path('conversations/<int:conversation_id>/rent-external', views.rent_finalize_external, name="rent_finalize_external"),
 ]
\ No newline at end of file
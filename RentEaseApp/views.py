@@ -1,100 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.urls import reverse
-from .models import Offer, Photo, Conversation, Message, Favorite, Contract, ContractTemplate
-
-
-def _format_price(value):
-    """Format number with space as thousands separator (e.g. 3255 -> '3 255')."""
-    if value is None:
-        return ''
-    try:
-        n = int(value)
-        return f'{n:,}'.replace(',', ' ')
-    except (ValueError, TypeError):
-        return str(value) if value else ''
+from .models import Offer, Photo, PhotoVariant, Conversation, Message, Favorite, Contract, ContractTemplate, PdfRenderJob
+from .photo_storage import create_photo, open_photo, open_blob, generate_variants
+from .images import VARIANT_SIZES, VARIANT_FORMATS
+from .pagination import keyset_page, ranked_page
+from .listing_cache import cached_listing
+from .offer_filters import SEARCH_FILTER, clean_filter_params, compile_filters, offer_facets
+from .search import search_rank
+from .events import get_broker, user_channel
+from .accounts import authenticate, get_logged_in_landlord, get_logged_in_tenant
+from .contracts import generate_contract_from_template
+from .pdf import (
+    REPORTLAB_AVAILABLE, cached_pdf_path, contract_pdf_filename, contract_pdf_inputs, contract_pdf_key, preview_pdf_inputs,
+)
+from .contract_export import contract_archive
+from .pdf_jobs import request_pdf
+from .previews import (
+    FIELD_LABELS, PreviewExpired, apply_structure_changes, load_template, preview_etag, render_preview,
+    store_template, structure_content,
+)
 from .forms import ContractPlaceholderForm
-
-FIELD_LABELS = {}
-for _cat, fields in ContractPlaceholderForm.get_field_groups():
-    for fn, label in fields:
-        FIELD_LABELS[fn] = label
+from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth.hashers import check_password, make_password
 from .forms import RegisterForm, LoginForm, OfferForm, ProfileForm
-from .models import LandlordUser, TenantUser
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from functools import wraps
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
 import json
-from django.db.models import Count
+from django.db.models import Exists, F, OuterRef, Prefetch, Subquery, Value, BooleanField
+from django.db.models.functions import Left
 import json
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-    from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    pdfmetrics = None
-    TTFont = None
-
-from io import BytesIO
-import os
-import base64
-
-
-def _register_pdf_fonts():
-    """Register Unicode (DejaVu) fonts for PDF so Polish and other characters render. Returns (normal_font, bold_font)."""
-    if not REPORTLAB_AVAILABLE or pdfmetrics is None or TTFont is None:
-        return ('Helvetica', 'Helvetica-Bold')
-    _base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    sans_paths = [
-        os.path.join(_base, 'static', 'fonts', 'DejaVuSans.ttf'),
-        '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-        '/usr/share/fonts/TTF/DejaVuSans.ttf',
-    ]
-    bold_paths = [
-        os.path.join(_base, 'static', 'fonts', 'DejaVuSans-Bold.ttf'),
-        '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
-        '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf',
-    ]
-    sans = next((p for p in sans_paths if os.path.isfile(p)), None)
-    bold = next((p for p in bold_paths if os.path.isfile(p)), None)
-    if sans:
-        try:
-            pdfmetrics.registerFont(TTFont('DejaVuSans', sans))
-            if bold:
-                pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', bold))
-            return ('DejaVuSans', 'DejaVuSans-Bold' if bold else 'DejaVuSans')
-        except Exception:
-            pass
-    return ('Helvetica', 'Helvetica-Bold')
-
-
-def get_logged_in_landlord(request):
-    """Helper function to get the logged-in landlord user from session"""
-    landlord_id = request.session.get('landlord_id')
-    if landlord_id:
-        try:
-            return LandlordUser.objects.get(id=landlord_id)
-        except LandlordUser.DoesNotExist:
-            return None
-    return None
-
-
-def get_logged_in_tenant(request):
-    """Helper function to get the logged-in tenant user from session"""
-    tenant_id = request.session.get('tenant_id')
-    if tenant_id:
-        try:
-            return TenantUser.objects.get(id=tenant_id)
-        except TenantUser.DoesNotExist:
-            return None
-    return None
+import time
 
 
 def landlord_required(view_func):
@@ -110,6 +52,67 @@ def landlord_required(view_func):
     return wrapper
 
 
+CARD_PHOTO_LIMIT = 5
+OFFERS_PAGE_SIZE = 24
+MESSAGES_PAGE_SIZE = 50
+PROFILE_CONVERSATIONS = 5
+
+
+def _card_photos_prefetch(lookup='photos', limit=CARD_PHOTO_LIMIT):
+    """Prefetch ids of the first `limit` photos of each offer into `offer.card_photos` (one query)."""
+    return Prefetch(
+        lookup,
+        queryset=Photo.objects.only('id', 'offer_id').order_by('id')[:limit],
+        to_attr='card_photos'
+    )
+
+
+def _search_offers(cleaned, tenant):
+    """Listed offers matching cleaned filter parameters, ready for rendering offer cards"""
+    offers = Offer.objects.exclude(status='Unavailable').filter(compile_filters(cleaned))
+    search_query = SEARCH_FILTER.query(cleaned)
+    if search_query:
+        offers = offers.annotate(rank=search_rank(search_query))
+    
+    if tenant:
+        offers = offers.annotate(is_favorite=Exists(
+            Favorite.objects.filter(tenant=tenant, offer=OuterRef('pk'))
+        ))
+    else:
+        offers = offers.annotate(is_favorite=Value(False, output_field=BooleanField()))
+    return offers.prefetch_related(_card_photos_prefetch())
+
+
+def _offers_page(request, cleaned, tenant):
+    """(offers, next_cursor) for the requested page; full-text searches are ordered by relevance"""
+    offers = _search_offers(cleaned, tenant)
+    cursor = request.GET.get('cursor')
+    if SEARCH_FILTER.query(cleaned):
+        return ranked_page(offers, cursor, OFFERS_PAGE_SIZE)
+    return keyset_page(offers, cursor, OFFERS_PAGE_SIZE)
+
+
+def _render_offers_page(request, cleaned, tenant):
+    """Requested page of offer cards as {"ids", "html", "next_cursor"}"""
+    offers, next_cursor = _offers_page(request, cleaned, tenant)
+    return {
+        "ids": [offer.id for offer in offers],
+        "html": render_to_string("offer_cards.html", {"offers": offers, "tenant": tenant}, request=request),
+        "next_cursor": next_cursor
+    }
+
+
+def _listing_page(request, cleaned, tenant):
+    """Rendered page of offer cards; pages without a tenant look the same for everyone and are cached"""
+    if tenant:
+        return _render_offers_page(request, cleaned, tenant)
+    return cached_listing(
+        'offer-page',
+        {"filters": cleaned, "cursor": request.GET.get('cursor', '')},
+        lambda: _render_offers_page(request, cleaned, None)
+    )
+
+
 def mainSite(request):
     landlord = get_logged_in_landlord(request)
     tenant = get_logged_in_tenant(request)
@@ -117,155 +120,30 @@ def mainSite(request):
     if tenant:
         assigned_offers = Offer.objects.filter(assigned_user=tenant, status='Unavailable')
     
-    offers = Offer.objects.exclude(status='Unavailable')
-    price_from = request.GET.get('price_from', '')
-    price_to = request.GET.get('price_to', '')
-    area_from = request.GET.get('area_from', '')
-    area_to = request.GET.get('area_to', '')
-    rooms_from = request.GET.get('rooms_from', '')
-    rooms_to = request.GET.get('rooms_to', '')
-    year_from = request.GET.get('year_from', '')
-    year_to = request.GET.get('year_to', '')
-    admin_fees_from = request.GET.get('admin_fees_from', '')
-    admin_fees_to = request.GET.get('admin_fees_to', '')
-    deposit_from = request.GET.get('deposit_from', '')
-    deposit_to = request.GET.get('deposit_to', '')
-    rental_period_from = request.GET.get('rental_period_from', '')
-    rental_period_to = request.GET.get('rental_period_to', '')
-    sale_or_rent = request.GET.get('sale_or_rent', '')
-    location = request.GET.get('location', '')
-    floor = request.GET.get('floor', '')
-    furnished = request.GET.get('furnished', '')
-    condition = request.GET.get('condition', '')
-    basement = request.GET.get('basement', '')
-    balcony_terrace_garden = request.GET.get('balcony_terrace_garden', '')
-    elevator = request.GET.get('elevator', '')
-    heating = request.GET.get('heating', '')
-    internet_fiber = request.GET.get('internet_fiber', '')
-    pets_allowed = request.GET.get('pets_allowed', '')
-    parking = request.GET.get('parking', '')
-    building_type = request.GET.get('building_type', '')
-    if price_from:
-        try:
-            offers = offers.filter(price__gte=int(price_from))
-        except ValueError:
-            pass
-    if price_to:
-        try:
-            offers = offers.filter(price__lte=int(price_to))
-        except ValueError:
-            pass
-    
-    if area_from:
-        try:
-            offers = offers.filter(area__gte=int(area_from))
-        except ValueError:
-            pass
-    if area_to:
-        try:
-            offers = offers.filter(area__lte=int(area_to))
-        except ValueError:
-            pass
-    
-    if rooms_from:
-        try:
-            offers = offers.filter(number_of_rooms__gte=int(rooms_from))
-        except ValueError:
-            pass
-    if rooms_to:
-        try:
-            offers = offers.filter(number_of_rooms__lte=int(rooms_to))
-        except ValueError:
-            pass
-    
-    if year_from:
-        try:
-            offers = offers.filter(year_built__gte=int(year_from))
-        except ValueError:
-            pass
-    if year_to:
-        try:
-            offers = offers.filter(year_built__lte=int(year_to))
-        except ValueError:
-            pass
-    
-    if admin_fees_from:
-        try:
-            offers = offers.filter(admin_fees__gte=int(admin_fees_from))
-        except ValueError:
-            pass
-    if admin_fees_to:
-        try:
-            offers = offers.filter(admin_fees__lte=int(admin_fees_to))
-        except ValueError:
-            pass
-    
-    if deposit_from:
-        try:
-            offers = offers.filter(deposit__gte=int(deposit_from))
-        except ValueError:
-            pass
-    if deposit_to:
-        try:
-            offers = offers.filter(deposit__lte=int(deposit_to))
-        except ValueError:
-            pass
-    
-    if rental_period_from:
-        try:
-            offers = offers.filter(minimum_rental_period__gte=int(rental_period_from))
-        except ValueError:
-            pass
-    if rental_period_to:
-        try:
-            offers = offers.filter(minimum_rental_period__lte=int(rental_period_to))
-        except ValueError:
-            pass
-    
-    if sale_or_rent:
-        offers = offers.filter(sale_or_rent=sale_or_rent)
-    if location:
-        offers = offers.filter(location__icontains=location)
-    if floor:
-        offers = offers.filter(floor=floor)
-    if furnished:
-        offers = offers.filter(furnished=furnished)
-    if condition:
-        offers = offers.filter(condition=condition)
-    if basement:
-        offers = offers.filter(basement=basement)
-    if balcony_terrace_garden:
-        offers = offers.filter(balcony_terrace_garden=balcony_terrace_garden)
-    if elevator:
-        offers = offers.filter(elevator=elevator)
-    if heating:
-        offers = offers.filter(heating=heating)
-    if internet_fiber:
-        offers = offers.filter(internet_fiber=internet_fiber)
-    if pets_allowed:
-        offers = offers.filter(pets_allowed=pets_allowed)
-    if parking:
-        offers = offers.filter(parking=parking)
-    if building_type:
-        offers = offers.filter(building_type=building_type)
-    
-    favorite_offer_ids = set()
-    if tenant:
-        favorite_offer_ids = set(
-            Favorite.objects.filter(tenant=tenant)
-            .values_list('offer_id', flat=True)
-        )
-    
-    offers_list = list(offers)
-    for offer in offers_list:
-        offer.is_favorite = offer.id in favorite_offer_ids
+    cleaned = clean_filter_params(request.GET)
+    page = _listing_page(request, cleaned, tenant)
     
     return render(request,"main_site.html", {
-        "offers": offers_list,
+        "offer_ids": page["ids"],
+        "offers_html": mark_safe(page["html"]),
+        "next_cursor": page["next_cursor"],
         "landlord": landlord,
         "tenant": tenant,
         "assigned_offers": assigned_offers,
-        "filter_params": request.GET
+        "filter_params": request.GET,
+        "facets": offer_facets(cleaned)
+    })
+
+
+@require_http_methods(["GET"])
+def offers_page(request):
+    """Next page of offer cards for infinite scroll (API endpoint)"""
+    tenant = get_logged_in_tenant(request)
+    page = _listing_page(request, clean_filter_params(request.GET), tenant)
+    return JsonResponse({
+        "html": page["html"],
+        "count": len(page["ids"]),
+        "next_cursor": page["next_cursor"]
     })
 
 
@@ -276,29 +154,12 @@ def loginPanel(request):
             email = form.cleaned_data['email']
             password = form.cleaned_data['password']
 
-            user = None
-            user_type = None
-            try:
-                user = LandlordUser.objects.get(email=email)
-                user_type = 'landlord'
-            except LandlordUser.DoesNotExist:
-                try:
-                    user = TenantUser.objects.get(email=email)
-                    user_type = 'tenant'
-                except TenantUser.DoesNotExist:
-                    user = None
-
-            if user and check_password(password, user.password):
-                if user_type == 'landlord':
-                    request.session['landlord_id'] = user.id
-                    request.session['user_type'] = 'landlord'
-                    messages.success(request, f"Welcome {user.name}!")
-                    return redirect('my_offers')
-                else:
-                    request.session['tenant_id'] = user.id
-                    request.session['user_type'] = 'tenant'
-                    messages.success(request, f"Welcome {user.name}!")
-                    return redirect('offers')
+            account = authenticate(email, password)
+            if account:
+                request.session[f'{account.user_type}_id'] = account.user_id
+                request.session['user_type'] = account.user_type
+                messages.success(request, f"Welcome {account.name}!")
+                return redirect('my_offers' if account.user_type == 'landlord' else 'offers')
             else:
                 messages.error(request, "Invalid email or password")
     else:
@@ -331,7 +192,9 @@ def registerPanel(request):
 def my_offers(request):
     """List all offers for the logged-in landlord"""
     landlord = request.landlord
-    offers = Offer.objects.filter(user=landlord).order_by('-created_at')
+    offers = Offer.objects.filter(user=landlord).select_related('assigned_user').prefetch_related(
+        _card_photos_prefetch(limit=1)
+    ).order_by('-created_at')
     return render(request, "my_offers.html", {"offers": offers, "landlord": landlord})
 
 
@@ -347,10 +210,7 @@ def create_offer(request):
             
             photos = request.FILES.getlist('photos')
             for photo_file in photos:
-                content = photo_file.read()
-                photo_data = base64.b64encode(content).decode('utf-8')
-                content_type = photo_file.content_type or 'image/jpeg'
-                Photo.objects.create(offer=offer, photo_data=photo_data, content_type=content_type)
+                create_photo(offer, photo_file.read(), photo_file.content_type)
             
             messages.success(request, "Offer created successfully!")
             return redirect('my_offers')
@@ -372,10 +232,7 @@ def edit_offer(request, offer_id):
             
             photos = request.FILES.getlist('photos')
             for photo_file in photos:
-                content = photo_file.read()
-                photo_data = base64.b64encode(content).decode('utf-8')
-                content_type = photo_file.content_type or 'image/jpeg'
-                Photo.objects.create(offer=offer, photo_data=photo_data, content_type=content_type)
+                create_photo(offer, photo_file.read(), photo_file.content_type)
             
             messages.success(request, "Offer updated successfully!")
             return redirect('my_offers')
@@ -435,6 +292,92 @@ def offer_detail(request, offer_id):
     })
 
 
+PHOTO_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def _get_photo_meta(request, photo_id):
+    """Load photo metadata once per request, without the image payload."""
+    if not hasattr(request, '_photo_meta'):
+        request._photo_meta = Photo.objects.filter(id=photo_id).values('id', 'created_at', 'blob__sha256').first()
+    return request._photo_meta
+
+
+def _photo_etag(request, photo_id):
+    meta = _get_photo_meta(request, photo_id)
+    if meta is None:
+        return None
+    if meta['blob__sha256']:
+        return meta['blob__sha256']
+    # Legacy rows not yet converted: photos are never modified, so id + upload time identifies the bytes.
+    return f"photo-{meta['id']}-{int(meta['created_at'].timestamp())}"
+
+
+def _photo_last_modified(request, photo_id):
+    meta = _get_photo_meta(request, photo_id)
+    return meta['created_at'] if meta else None
+
+
+def _cacheable_photo_response(content, content_type):
+    response = FileResponse(content, content_type=content_type)
+    patch_cache_control(response, public=True, max_age=PHOTO_CACHE_MAX_AGE, immutable=True)
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_photo_etag, last_modified_func=_photo_last_modified)
+def photo(request, photo_id):
+    """Serve photo bytes with long-lived cache headers (304 handled by @condition)"""
+    photo = Photo.objects.select_related('blob').defer('blob__data').filter(id=photo_id).first()
+    content = open_photo(photo) if photo else None
+    if content is None:
+        raise Http404("Photo not found")
+    return _cacheable_photo_response(content, photo.content_type or 'image/jpeg')
+
+
+def _get_photo_variant_meta(request, photo_id, size, fmt):
+    """Load variant metadata once per request, without the image payload."""
+    if not hasattr(request, '_photo_variant_meta'):
+        request._photo_variant_meta = PhotoVariant.objects.filter(
+            photo_id=photo_id, size=size, format=fmt
+        ).values('blob__sha256', 'photo__created_at').first()
+    return request._photo_variant_meta
+
+
+def _photo_variant_etag(request, photo_id, size, fmt):
+    meta = _get_photo_variant_meta(request, photo_id, size, fmt)
+    return meta['blob__sha256'] if meta else None
+
+
+def _photo_variant_last_modified(request, photo_id, size, fmt):
+    meta = _get_photo_variant_meta(request, photo_id, size, fmt)
+    return meta['photo__created_at'] if meta else None
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_photo_variant_etag, last_modified_func=_photo_variant_last_modified)
+def photo_variant(request, photo_id, size, fmt):
+    """Serve a resized photo derivative, rendering it on first request if it is missing"""
+    if size not in VARIANT_SIZES or fmt not in VARIANT_FORMATS:
+        raise Http404("Unknown photo variant")
+    variants = PhotoVariant.objects.select_related('blob', 'photo').defer('blob__data', 'photo__photo_data')
+    variant = variants.filter(photo_id=photo_id, size=size, format=fmt).first()
+    if variant is None:
+        photo = get_object_or_404(Photo.objects.select_related('blob').defer('blob__data'), id=photo_id)
+        original = open_photo(photo)
+        if original is None:
+            raise Http404("Photo not found")
+        with original:
+            rendered = generate_variants(photo, original.read())
+        if not rendered:
+            # Not a decodable image - fall back to the original upload.
+            return redirect('photo', photo_id=photo_id)
+        variant = variants.get(photo_id=photo_id, size=size, format=fmt)
+    response = _cacheable_photo_response(open_blob(variant.blob), VARIANT_FORMATS[fmt][1])
+    response['ETag'] = quote_etag(variant.blob.sha256)
+    response['Last-Modified'] = http_date(variant.photo.created_at.timestamp())
+    return response
+
+
 def tenant_required(view_func):
     """Decorator to require tenant login"""
     @wraps(view_func)
@@ -448,6 +391,22 @@ def tenant_required(view_func):
     return wrapper
 
 
+def _inbox_conversations(user_type, user):
+    """
+    Conversations of a landlord or tenant, most recently active first, ready for inbox rows.
+
+    Last message and unread count come from the columns Conversation maintains
+    itself, so rendering needs no per-row message queries.
+    """
+    return (
+        Conversation.objects
+        .filter(**{user_type: user})
+        .select_related('offer', 'landlord', 'tenant')
+        .annotate(unread_count=F(f"unread_for_{user_type}"))
+        .order_by(F('last_message_at').desc(nulls_last=True), '-id')
+    )
+
+
 @require_http_methods(["GET", "POST"])
 def conversations_list(request):
     """List all conversations for the logged-in user"""
@@ -458,24 +417,8 @@ def conversations_list(request):
         messages.error(request, "Please login to view conversations.")
         return redirect('login')
     
-    if landlord:
-        conversations = Conversation.objects.filter(
-            landlord=landlord
-        ).annotate(
-            message_count=Count('messages')
-        ).filter(
-            message_count__gt=0
-        ).order_by('-created_at')
-        user_type = 'landlord'
-    else:
-        conversations = Conversation.objects.filter(
-            tenant=tenant
-        ).annotate(
-            message_count=Count('messages')
-        ).filter(
-            message_count__gt=0
-        ).order_by('-created_at')
-        user_type = 'tenant'
+    user_type = 'landlord' if landlord else 'tenant'
+    conversations = _inbox_conversations(user_type, landlord or tenant).filter(last_message_at__isnull=False)
     
     return render(request, "conversations_list.html", {
         "conversations": conversations,
@@ -488,7 +431,7 @@ def conversations_list(request):
 @require_http_methods(["GET", "POST"])
 def conversation_detail(request, conversation_id):
     """View conversation details and send messages"""
-    conversation = get_object_or_404(Conversation, id=conversation_id)
+    conversation = get_object_or_404(Conversation.objects.select_related('offer', 'landlord', 'tenant'), id=conversation_id)
     landlord = get_logged_in_landlord(request)
     tenant = get_logged_in_tenant(request)
     
@@ -511,24 +454,23 @@ def conversation_detail(request, conversation_id):
     if request.method == 'POST':
         content = request.POST.get('content', '').strip()
         if content:
-            Message.objects.create(
-                conversation=conversation,
-                sender_id=current_user.id,
+            conversation.add_message(
                 sender_type=user_type,
+                sender_id=current_user.id,
                 content=content
             )
             return redirect('conversation_detail', conversation_id=conversation_id)
     
-    if user_type == 'landlord':
-        conversation.messages.filter(sender_type='tenant').update(read_by_landlord=True)
-    else:
-        conversation.messages.filter(sender_type='landlord').update(read_by_tenant=True)
+    if getattr(conversation, f"unread_for_{user_type}"):
+        conversation.mark_read(user_type)
     
-    messages_list = conversation.messages.all().order_by('created_at')
+    # Only the latest page; older messages are fetched by cursor from conversation_messages
+    latest, older_cursor = keyset_page(conversation.messages.all(), None, MESSAGES_PAGE_SIZE)
     
     return render(request, "conversation_detail.html", {
         "conversation": conversation,
-        "messages": messages_list,
+        "messages": latest[::-1],
+        "older_cursor": older_cursor,
         "user_type": user_type,
         "landlord": landlord,
         "tenant": tenant,
@@ -536,6 +478,29 @@ def conversation_detail(request, conversation_id):
     })
 
 
+@require_http_methods(["GET"])
+def conversation_messages(request, conversation_id):
+    """Page of messages older than `cursor`, oldest first (API endpoint)"""
+    conversation = get_object_or_404(Conversation, id=conversation_id)
+    landlord = get_logged_in_landlord(request)
+    tenant = get_logged_in_tenant(request)
+    
+    if landlord and conversation.landlord_id == landlord.id:
+        user_type = 'landlord'
+    elif tenant and conversation.tenant_id == tenant.id:
+        user_type = 'tenant'
+    else:
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    
+    older, next_cursor = keyset_page(conversation.messages.all(), request.GET.get('cursor'), MESSAGES_PAGE_SIZE)
+    html = render_to_string("message_bubbles.html", {"messages": older[::-1], "user_type": user_type})
+    return JsonResponse({
+        "html": html,
+        "count": len(older),
+        "next_cursor": next_cursor
+    })
+
+
 @require_http_methods(["GET", "POST"])
 def conversation_detail_from_offer(request, offer_id):
     """View or create conversation from offer (lazy creation - only creates on first message)"""
@@ -577,10 +542,9 @@ def conversation_detail_from_offer(request, offer_id):
                 tenant=tenant
             )
             
-            Message.objects.create(
-                conversation=conversation,
-                sender_id=current_user.id,
+            conversation.add_message(
                 sender_type=user_type,
+                sender_id=current_user.id,
                 content=content
             )
             
@@ -620,58 +584,110 @@ def assign_tenant_to_offer(request, conversation_id):
     return rent_finalize(request, conversation_id)
 
 
+def _notifications_payload(user_type, user_id):
+    """Unread count and per-conversation notifications for a landlord or tenant"""
+    other_type = 'tenant' if user_type == 'landlord' else 'landlord'
+    unread_field = f"unread_for_{user_type}"
+    # One query over the denormalized counters maintained by Conversation.add_message()/mark_read().
+    # last_message_preview may be the user's own reply, so the notification text is the
+    # latest message from the other side, looked up only for conversations with unread ones.
+    latest_unread = (
+        Message.objects
+        .filter(conversation=OuterRef('pk'), sender_type=other_type)
+        .order_by('-created_at', '-id')
+        .values('content')[:1]
+    )
+    conversations = (
+        Conversation.objects
+        .filter(**{f"{user_type}_id": user_id, f"{unread_field}__gt": 0})
+        .select_related('offer', other_type)
+        .only(
+            'id', unread_field, 'offer__id', 'offer__title',
+            f'{other_type}__name', f'{other_type}__surname'
+        )
+        .annotate(latest_message=Left(Subquery(latest_unread), 50))
+        .order_by('-last_message_at', '-id')
+    )
+    
+    notifications = []
+    unread_count = 0
+    for conversation in conversations:
+        other = getattr(conversation, other_type)
+        count = getattr(conversation, unread_field)
+        unread_count += count
+        notifications.append({
+            "conversation_id": conversation.id,
+            "offer_title": conversation.offer.title,
+            "offer_id": conversation.offer.id,
+            f"{other_type}_name": f"{other.name} {other.surname}",
+            "unread_count": count,
+            "latest_message": conversation.latest_message or ""
+        })
+    return {"unread_count": unread_count, "notifications": notifications}
+
+
 def get_notifications(request):
     """Get notification count and details for unread messages"""
     landlord = get_logged_in_landlord(request)
     tenant = get_logged_in_tenant(request)
     
-    if not landlord and not tenant:
-        return JsonResponse({"unread_count": 0, "notifications": []})
-    
-    notifications = []
-    unread_count = 0
-    
     if landlord:
-        conversations = Conversation.objects.filter(landlord=landlord)
-        for conversation in conversations:
-            unread_messages = conversation.messages.filter(
-                read_by_landlord=False,
-                sender_type='tenant'
-            )
-            count = unread_messages.count()
-            if count > 0:
-                unread_count += count
-                notifications.append({
-                    "conversation_id": conversation.id,
-                    "offer_title": conversation.offer.title,
-                    "offer_id": conversation.offer.id,
-                    "tenant_name": f"{conversation.tenant.name} {conversation.tenant.surname}",
-                    "unread_count": count,
-                    "latest_message": unread_messages.last().content[:50] if unread_messages.last() else ""
-                })
-    elif tenant:
-        conversations = Conversation.objects.filter(tenant=tenant)
-        for conversation in conversations:
-            unread_messages = conversation.messages.filter(
-                read_by_tenant=False,
-                sender_type='landlord'
-            )
-            count = unread_messages.count()
-            if count > 0:
-                unread_count += count
-                notifications.append({
-                    "conversation_id": conversation.id,
-                    "offer_title": conversation.offer.title,
-                    "offer_id": conversation.offer.id,
-                    "landlord_name": f"{conversation.landlord.name} {conversation.landlord.surname}",
-                    "unread_count": count,
-                    "latest_message": unread_messages.last().content[:50] if unread_messages.last() else ""
-                })
-    
-    return JsonResponse({
-        "unread_count": unread_count,
-        "notifications": notifications
-    })
+        return JsonResponse(_notifications_payload('landlord', landlord.id))
+    if tenant:
+        return JsonResponse(_notifications_payload('tenant', tenant.id))
+    return JsonResponse({"unread_count": 0, "notifications": []})
+
+
+def _session_user(request):
+    """(user_type, user_id) of the logged-in user, or None"""
+    for user_type in ('landlord', 'tenant'):
+        user_id = request.session.get(f'{user_type}_id')
+        if user_id:
+            return user_type, user_id
+    return None
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+NOTIFICATION_STREAM_KEEPALIVE = 25
+NOTIFICATION_STREAM_MAX_AGE = 300
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of notification payloads (API endpoint).
+
+    Sends the current payload on connect and a fresh one whenever an event
+    arrives on the user's channel (see events.py). Needs an ASGI server;
+    elsewhere it answers 204, which tells EventSource to stop and the page
+    to fall back to polling /notifications.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await sync_to_async(_session_user)(request)
+    if not user:
+        return HttpResponse(status=204)
+    user_type, user_id = user
+    
+    async def stream():
+        with get_broker().subscribe(user_channel(user_type, user_id)) as subscription:
+            yield "retry: 5000\n\n"
+            yield _sse("notifications", await sync_to_async(_notifications_payload)(user_type, user_id))
+            # Close periodically; EventSource reconnects on its own, which rebalances workers.
+            deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_AGE
+            while time.monotonic() < deadline:
+                event = await subscription.get(timeout=NOTIFICATION_STREAM_KEEPALIVE)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse("notifications", await sync_to_async(_notifications_payload)(user_type, user_id))
+    
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @require_http_methods(["POST"])
@@ -682,9 +698,9 @@ def mark_messages_as_read(request, conversation_id):
     tenant = get_logged_in_tenant(request)
     
     if landlord and conversation.landlord == landlord:
-        conversation.messages.filter(sender_type='tenant').update(read_by_landlord=True)
+        conversation.mark_read('landlord')
     elif tenant and conversation.tenant == tenant:
-        conversation.messages.filter(sender_type='landlord').update(read_by_tenant=True)
+        conversation.mark_read('tenant')
     else:
         return JsonResponse({"error": "Unauthorized"}, status=403)
     
@@ -706,12 +722,11 @@ def profile(request):
     
     assigned_offers = None
     if tenant:
-        assigned_offers = Offer.objects.filter(assigned_user=tenant, status='Unavailable')
+        assigned_offers = Offer.objects.filter(assigned_user=tenant, status='Unavailable').prefetch_related(
+            _card_photos_prefetch(limit=1)
+        )
     
-    if landlord:
-        conversations = Conversation.objects.filter(landlord=landlord).order_by('-created_at')
-    else:
-        conversations = Conversation.objects.filter(tenant=tenant).order_by('-created_at')
+    conversations = _inbox_conversations(user_type, user)
     
     if request.method == 'POST':
         form = ProfileForm(request.POST, user=user, user_type=user_type)
@@ -729,7 +744,8 @@ def profile(request):
         "tenant": tenant,
         "form": form,
         "assigned_offers": assigned_offers,
-        "conversations": conversations
+        "recent_conversations": conversations[:PROFILE_CONVERSATIONS],
+        "conversation_count": conversations.count()
     })
 
 
@@ -768,12 +784,14 @@ def get_favorites(request):
     if not tenant:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
-    favorites = Favorite.objects.filter(tenant=tenant).select_related('offer')
+    favorites = Favorite.objects.filter(tenant=tenant).select_related('offer').prefetch_related(
+        _card_photos_prefetch('offer__photos', limit=1)
+    )
     favorite_offers = [fav.offer for fav in favorites]
     
     offers_data = []
     for offer in favorite_offers:
-        first_photo = offer.photos.first()
+        first_photo = offer.card_photos[0] if offer.card_photos else None
         offers_data.append({
             "id": offer.id,
             "title": offer.title,
@@ -783,7 +801,7 @@ def get_favorites(request):
             "number_of_rooms": offer.number_of_rooms,
             "sale_or_rent": offer.sale_or_rent,
             "status": offer.status,
-            "photo_url": first_photo.data_uri if first_photo else None,
+            "photo_url": first_photo.variant_url('card', 'jpeg') if first_photo else None,
             "created_at": offer.created_at.isoformat()
         })
     
@@ -802,7 +820,9 @@ def favorites_page(request):
         messages.error(request, "Please login to view your favorites.")
         return redirect('login')
     
-    favorites = Favorite.objects.filter(tenant=tenant).select_related('offer')
+    favorites = Favorite.objects.filter(tenant=tenant).select_related('offer').prefetch_related(
+        _card_photos_prefetch('offer__photos', limit=1)
+    )
     favorite_offers = [fav.offer for fav in favorites]
     
     return render(request, "favorites.html", {
@@ -883,10 +903,9 @@ def create_contract(request, template_id=None):
                         offer.assigned_user = tenant
                         offer.save()
                         
-                        Message.objects.create(
-                            conversation=conversation,
-                            sender_id=landlord.id,
+                        conversation.add_message(
                             sender_type='landlord',
+                            sender_id=landlord.id,
                             content=f"📄 A contract has been generated for {offer.title}. Please review and sign the contract in your Contracts section."
                         )
                         
@@ -994,9 +1013,37 @@ def view_contract_landlord(request, contract_id):
     })
 
 
-@require_http_methods(["GET"])
+def _get_contract_pdf(request, contract_id):
+    """(contract, pdf inputs, pdf key) of a contract the user may download, or None; loaded once per request."""
+    if not hasattr(request, '_contract_pdf'):
+        tenant = get_logged_in_tenant(request)
+        landlord = get_logged_in_landlord(request)
+        contracts = Contract.objects.select_related('offer', 'tenant', 'landlord', 'template')
+        if tenant:
+            contract = contracts.filter(id=contract_id, tenant=tenant).first()
+        elif landlord:
+            contract = contracts.filter(id=contract_id, landlord=landlord).first()
+        else:
+            contract = None
+        if contract is None:
+            request._contract_pdf = None
+        else:
+            inputs = contract_pdf_inputs(contract)
+            request._contract_pdf = (contract, inputs, contract_pdf_key(inputs))
+    return request._contract_pdf
+
+
+def _contract_pdf_etag(request, contract_id):
+    if not REPORTLAB_AVAILABLE:
+        return None
+    found = _get_contract_pdf(request, contract_id)
+    return found[2] if found else None
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_contract_pdf_etag)
 def download_contract_pdf(request, contract_id):
-    """Download contract as PDF"""
+    """Download contract as PDF, served from the rendered-file cache (304 handled by @condition)"""
     if not REPORTLAB_AVAILABLE:
         back_url = request.build_absolute_uri(
             reverse('view_contract', args=[contract_id]) if get_logged_in_tenant(request)
@@ -1010,127 +1057,124 @@ def download_contract_pdf(request, contract_id):
         )
         return HttpResponse(html, content_type='text/html; charset=utf-8', status=503)
 
-    tenant = get_logged_in_tenant(request)
-    landlord = get_logged_in_landlord(request)
-
-    if not tenant and not landlord:
+    if not get_logged_in_tenant(request) and not get_logged_in_landlord(request):
         messages.error(request, "You must be logged in to download contracts.")
         return redirect('offers')
 
-    if tenant:
-        contract = get_object_or_404(Contract, id=contract_id, tenant=tenant)
-    elif landlord:
-        contract = get_object_or_404(Contract, id=contract_id, landlord=landlord)
-    else:
-        messages.error(request, "You don't have permission to download this contract.")
-        return redirect('offers')
-
-    if contract.template and contract.offer and contract.tenant and contract.landlord:
-        contract_content = generate_contract_from_template(
-            contract.template, contract.offer, contract.tenant, contract.landlord
-        )
-    else:
-        contract_content = contract.final_content or (contract.template.template_content if contract.template else "")
-
-    pdf_font, pdf_font_bold = _register_pdf_fonts()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4,
-                           rightMargin=72, leftMargin=72,
-                           topMargin=72, bottomMargin=72)
-
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=18,
-        textColor='#1a1a1a',
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        fontName=pdf_font_bold
-    )
-
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor='#1a1a1a',
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName=pdf_font_bold
-    )
-
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor='#1a1a1a',
-        spaceAfter=12,
-        leading=14,
-        alignment=TA_JUSTIFY,
-        fontName=pdf_font
+    found = _get_contract_pdf(request, contract_id)
+    if found is None:
+        raise Http404("Contract not found")
+    contract, inputs, key = found
+
+    path = cached_pdf_path(contract.id, key)
+    if path is None:
+        job = request_pdf(contract.id, inputs, key)
+        # None: the file appeared meanwhile (a worker or a concurrent request wrote it).
+        if job is not None and job.status != PdfRenderJob.DONE:
+            return _pdf_job_pending(request, job)
+        path = cached_pdf_path(contract.id, key)
+
+    response = FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=contract_pdf_filename(contract),
+        content_type='application/pdf',
     )
+    response['ETag'] = quote_etag(key)
+    # Private, and revalidated on every download: a signature changes the ETag.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    title = Paragraph("Lease Agreement", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 0.3*inch))
 
-    meta_info = f"""
-    <b>Property:</b> {contract.offer.title}<br/>
-    <b>Location:</b> {contract.offer.location or 'N/A'}<br/>
-    <b>Landlord:</b> {contract.landlord.name} {contract.landlord.surname}<br/>
-    <b>Tenant:</b> {contract.tenant.name} {contract.tenant.surname}<br/>
-    <b>Date Created:</b> {contract.created_at.strftime('%B %d, %Y')}<br/>
-    """
-    elements.append(Paragraph(meta_info, normal_style))
-    elements.append(Spacer(1, 0.3*inch))
-
-    elements.append(Spacer(1, 0.1*inch))
-    elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
-    elements.append(Spacer(1, 0.2*inch))
-
-    paragraphs = contract_content.split('\n')
-    for para in paragraphs:
-        para = para.strip()
-        if para:
-            para = ' '.join(para.split())
-            para = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-            elements.append(Paragraph(para, normal_style))
-            elements.append(Spacer(1, 0.1*inch))
-
-    elements.append(Spacer(1, 0.3*inch))
-    elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
-    elements.append(Spacer(1, 0.2*inch))
-
-    signature_info = f"""
-    <b>Signatures:</b><br/><br/>
-    <b>Tenant:</b> {'✅ Signed' if contract.signed_by_tenant else '⏳ Pending'}
+async def _pull_in_thread(iterator):
     """
-    if contract.signed_by_tenant and contract.signed_by_tenant_at:
-        signature_info += f" on {contract.signed_by_tenant_at.strftime('%B %d, %Y at %H:%M')}"
-    signature_info += "<br/><br/>"
+    Async iterator over a sync one, fetching each item with sync_to_async.
 
-    signature_info += f"""
-    <b>Landlord:</b> {'✅ Signed' if contract.signed_by_landlord else '⏳ Pending'}
+    Under ASGI, StreamingHttpResponse would otherwise list() a sync iterator
+    before sending the first byte.
     """
-    if contract.signed_by_landlord and contract.signed_by_landlord_at:
-        signature_info += f" on {contract.signed_by_landlord_at.strftime('%B %d, %Y at %H:%M')}"
+    done = object()
+    try:
+        while (item := await sync_to_async(next)(iterator, done)) is not done:
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+@require_http_methods(["GET"])
+@landlord_required
+def export_contracts_zip(request):
+    """Stream a ZIP with the PDFs of the selected contracts (?contract=<id>, repeatable), or all of them"""
+    if not REPORTLAB_AVAILABLE:
+        return HttpResponse("PDF export is not available: the reportlab package is not installed.",
+                            content_type='text/plain; charset=utf-8', status=503)
+    landlord = get_logged_in_landlord(request)
+    contracts = Contract.objects.filter(landlord=landlord).select_related('offer', 'tenant', 'landlord', 'template')
+    selected = [value for value in request.GET.getlist('contract') if value.isdigit()]
+    if selected:
+        contracts = contracts.filter(id__in=selected)
+    contracts = list(contracts.order_by('-created_at'))
+    if not contracts:
+        messages.error(request, "There are no contracts to export.")
+        return redirect('manage_contracts')
+
+    from django.utils import timezone
+    archive = contract_archive(contracts)
+    if isinstance(request, ASGIRequest):
+        archive = _pull_in_thread(archive)
+    response = StreamingHttpResponse(archive, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="contracts_{timezone.localdate():%Y-%m-%d}.zip"'
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+def _pdf_job_payload(job):
+    if job.contract_id:
+        download_url = reverse('download_contract_pdf', args=[job.contract_id])
+    else:
+        download_url = reverse('pdf_job_file', args=[job.key])
+    return {
+        "status": job.status,
+        "error": job.error,
+        "status_url": reverse('pdf_job_status', args=[job.key]),
+        "download_url": download_url,
+    }
 
-    elements.append(Paragraph(signature_info, normal_style))
 
-    doc.build(elements)
+def _pdf_job_pending(request, job):
+    """202 for a PDF still being rendered: JSON for scripts, a self-refreshing page for browsers."""
+    payload = _pdf_job_payload(job)
+    if 'application/json' in request.headers.get('Accept', ''):
+        response = JsonResponse(payload, status=202)
+    else:
+        response = render(request, "pdf_pending.html", payload, status=202)
+    # Never store this under the PDF's ETag, or a revalidation would keep showing it.
+    patch_cache_control(response, no_store=True)
+    return response
+
 
-    pdf = buffer.getvalue()
-    buffer.close()
+@require_http_methods(["GET"])
+def pdf_job_status(request, key):
+    """Poll a PDF rendering job; the key (hash of the PDF's contents) is the capability"""
+    if not get_logged_in_tenant(request) and not get_logged_in_landlord(request):
+        return JsonResponse({"error": "Unauthorized"}, status=403)
+    job = get_object_or_404(PdfRenderJob, key=key)
+    return JsonResponse(_pdf_job_payload(job))
 
-    response = HttpResponse(pdf, content_type='application/pdf')
-    safe_title = "".join(c if c.isalnum() or c in "._-" else "_" for c in contract.offer.title)[:50]
-    filename = f"contract_{safe_title}_{contract.id}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    response['Content-Length'] = len(pdf)
 
+@require_http_methods(["GET"])
+@landlord_required
+@condition(etag_func=lambda request, key: key)
+def pdf_job_file(request, key):
+    """A rendered template preview; its key is a content hash, so the file never changes"""
+    job = get_object_or_404(PdfRenderJob, key=key, contract__isnull=True)
+    path = cached_pdf_path(None, job.key)
+    if path is None:
+        raise Http404("Preview not rendered")
+    response = FileResponse(open(path, 'rb'), as_attachment=True, filename="contract_template_preview.pdf",
+                            content_type="application/pdf")
+    response['ETag'] = quote_etag(key)
+    patch_cache_control(response, private=True, max_age=settings.CONTRACT_PREVIEW_CACHE_TIMEOUT)
     return response
 
 
@@ -1153,10 +1197,9 @@ def sign_contract(request, contract_id, signer_type):
         
         conversation = Conversation.objects.filter(offer=contract.offer, tenant=tenant, landlord=contract.landlord).first()
         if conversation:
-            Message.objects.create(
-                conversation=conversation,
-                sender_id=tenant.id,
+            conversation.add_message(
                 sender_type='tenant',
+                sender_id=tenant.id,
                 content=f"✅ {tenant.name} {tenant.surname} has signed the contract for {contract.offer.title}."
             )
         
@@ -1178,10 +1221,9 @@ def sign_contract(request, contract_id, signer_type):
         
         conversation = Conversation.objects.filter(offer=contract.offer, tenant=contract.tenant, landlord=landlord).first()
         if conversation:
-            Message.objects.create(
-                conversation=conversation,
-                sender_id=landlord.id,
+            conversation.add_message(
                 sender_type='landlord',
+                sender_id=landlord.id,
                 content=f"✅ {landlord.name} {landlord.surname} has signed the contract for {contract.offer.title}."
             )
         
@@ -1210,137 +1252,104 @@ def _get_template_preview_display(template):
     return content
 
 
-def _build_preview_content_with_labels(template_content, template_structure, landlord=None, offer=None):
-    """Build content with placeholders as [Label] for manage_contracts display. Uses structure if available."""
-    if template_structure:
-        parts = []
-        for item in template_structure:
-            if item.get("type") == "text":
-                parts.append(item.get("content", ""))
-            elif item.get("type") == "block":
-                label = item.get("label") or FIELD_LABELS.get(item.get("field_name", ""), item.get("field_name", ""))
-                parts.append(f"[{label}]")
-        content = "".join(parts)
-    else:
-        content = template_content or ""
-        for field_name, label in FIELD_LABELS.items():
-            content = content.replace("{{" + field_name + "}}", f"[{label}]")
-    if landlord:
-        content = content.replace("**Email**", landlord.email or "[Email]")
-        content = content.replace("**Phone**", landlord.phone_number or "[Phone]")
-        content = content.replace("**Bank Account**", landlord.bank_account_number or "[Bank Account]")
-    if offer:
-        content = content.replace("**Location**", offer.location or "[Location]")
-        content = content.replace("**Area**", str(offer.area) if offer.area else "[Area]")
-        content = content.replace("**Rooms**", str(offer.number_of_rooms) if offer.number_of_rooms else "[Rooms]")
-        content = content.replace("**Floor**", offer.floor or "[Floor]")
-        content = content.replace("**Price**", _format_price(offer.price) if offer.price else "[Price]")
-    return content
+def _preview_template(request, landlord):
+    """
+    The {'content', 'structure'} template a preview request describes: a stored
+    `version`, `changes` against a stored `base_version`, or the whole template.
+    Raises PreviewExpired when the stored version is gone, ValueError when the
+    changes are malformed.
+    """
+    version = request.POST.get("version")
+    if version:
+        return load_template(landlord.id, version)
+    base_version = request.POST.get("base_version")
+    if base_version:
+        base = load_template(landlord.id, base_version)
+        if not base["structure"]:
+            raise ValueError("Changes can only be applied to a template structure")
+        try:
+            changes = json.loads(request.POST.get("changes", "[]"))
+        except ValueError:
+            raise ValueError("Changes are not valid JSON")
+        structure = apply_structure_changes(base["structure"], changes)
+        return {"content": structure_content(structure), "structure": structure}
+    structure = None
+    template_structure_json = request.POST.get("template_structure", "")
+    if template_structure_json:
+        try:
+            structure = json.loads(template_structure_json)
+        except (ValueError, TypeError):
+            pass
+    if isinstance(structure, list) and structure:
+        # The structure decides the preview; content derived from it keeps versions canonical.
+        return {"content": structure_content(structure), "structure": structure}
+    return {"content": request.POST.get("template_content", ""), "structure": None}
+
+
+def _preview_offer(request, landlord):
+    """The landlord's offer whose data fills the preview (offer_id), loaded once per request."""
+    if not hasattr(request, '_preview_offer'):
+        offer_id = request.POST.get("offer_id") or request.GET.get("offer_id") or ""
+        request._preview_offer = (
+            Offer.objects.filter(id=offer_id, user=landlord).first() if offer_id.isdigit() else None
+        )
+    return request._preview_offer
 
 
-def _build_preview_content_for_pdf(template_content, template_structure, landlord, offer=None):
-    """Build preview content for PDF: landlord and property with real data, tenant as [Label]."""
-    if template_structure:
-        parts = []
-        for item in template_structure:
-            if item.get("type") == "text":
-                parts.append(item.get("content", ""))
-            elif item.get("type") == "block":
-                fn = item.get("field_name", "")
-                label = item.get("label") or FIELD_LABELS.get(fn, fn)
-                if fn.startswith("landlord_") and landlord:
-                    val = get_placeholder_value(fn, None, None, landlord)
-                    parts.append(val if val else f"[{label}]")
-                elif fn.startswith("property_") and offer:
-                    val = get_placeholder_value(fn, offer, None, landlord)
-                    parts.append(val if val else f"[{label}]")
-                else:
-                    parts.append(f"[{label}]")
-        return "".join(parts)
-    content = template_content or ""
-    for field_name, label in FIELD_LABELS.items():
-        if field_name.startswith("tenant_"):
-            content = content.replace("{{" + field_name + "}}", f"[{label}]")
-        elif field_name.startswith("landlord_") and landlord:
-            val = get_placeholder_value(field_name, None, None, landlord)
-            content = content.replace("{{" + field_name + "}}", val or f"[{label}]")
-        elif field_name.startswith("property_") and offer:
-            val = get_placeholder_value(field_name, offer, None, landlord)
-            content = content.replace("{{" + field_name + "}}", val or f"[{label}]")
-        else:
-            content = content.replace("{{" + field_name + "}}", f"[{label}]")
-    if landlord:
-        content = content.replace("**Email**", landlord.email or "[Email]")
-        content = content.replace("**Phone**", landlord.phone_number or "[Phone]")
-        content = content.replace("**Bank Account**", landlord.bank_account_number or "[Bank Account]")
-    if offer:
-        content = content.replace("**Location**", offer.location or "[Location]")
-        content = content.replace("**Area**", str(offer.area) if offer.area else "[Area]")
-        content = content.replace("**Rooms**", str(offer.number_of_rooms) if offer.number_of_rooms else "[Rooms]")
-        content = content.replace("**Floor**", offer.floor or "[Floor]")
-        content = content.replace("**Price**", _format_price(offer.price) if offer.price else "[Price]")
-    return content
+def _preview_expired():
+    return JsonResponse({"error": "Preview expired, send the whole template again", "resync": True}, status=409)
+
+
+def _preview_response(preview_content, etag, **extra):
+    response = JsonResponse({"success": True, "preview_content": preview_content, **extra})
+    response['ETag'] = quote_etag(etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @require_http_methods(["POST"])
 @landlord_required
 def preview_contract(request):
-    """Preview contract template with sample data"""
+    """
+    Preview a contract template with landlord and property data filled in (tenant fields as [Label]).
+    Returns the template's version, so the editor can send only changes against it next time.
+    """
     landlord = get_logged_in_landlord(request)
-    
-    template_content = request.POST.get('template_content', '')
-    offer_id = request.POST.get('offer_id')  
-    
-    if not template_content:
+    try:
+        template = _preview_template(request, landlord)
+    except PreviewExpired:
+        return _preview_expired()
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if not template["content"] and not template["structure"]:
         return JsonResponse({"error": "Template content is required"}, status=400)
-    
-    offer = None
-    if offer_id:
-        offer = Offer.objects.filter(id=offer_id, user=landlord).first()
-    
-    preview_content = template_content
-    
-    preview_content = preview_content.replace('{{tenant_name}}', '[Tenant Name]')
-    preview_content = preview_content.replace('{{tenant_surname}}', '[Tenant Surname]')
-    preview_content = preview_content.replace('{{tenant_full_name}}', '[Tenant Full Name]')
-    preview_content = preview_content.replace('{{tenant_pesel}}', '[PESEL]')
-    preview_content = preview_content.replace('{{tenant_id_card}}', '[ID Card Number]')
-    preview_content = preview_content.replace('{{tenant_address}}', '[Tenant Address]')
-    preview_content = preview_content.replace('{{tenant_phone}}', '[Phone Number]')
-    preview_content = preview_content.replace('{{tenant_email}}', '[Email]')
-    preview_content = preview_content.replace('{{tenant_bank_account}}', '[Bank Account]')
-    
-    preview_content = preview_content.replace('{{landlord_name}}', landlord.name or '')
-    preview_content = preview_content.replace('{{landlord_surname}}', landlord.surname or '')
-    preview_content = preview_content.replace('{{landlord_full_name}}', f"{landlord.name} {landlord.surname}" or '')
-    preview_content = preview_content.replace('{{landlord_pesel}}', landlord.pesel or '')
-    preview_content = preview_content.replace('{{landlord_id_card}}', landlord.id_card_number or '')
-    preview_content = preview_content.replace('{{landlord_address}}', landlord.get_full_address() or '')
-    preview_content = preview_content.replace('{{landlord_phone}}', landlord.phone_number or '')
-    preview_content = preview_content.replace('{{landlord_email}}', landlord.email or '')
-    preview_content = preview_content.replace('{{landlord_bank_account}}', landlord.bank_account_number or '')
-    
+
+    version = store_template(landlord.id, template)
+    offer = _preview_offer(request, landlord)
+    preview_content, etag = render_preview(template, landlord, offer)
+    preview_url = reverse('contract_preview', args=[version])
     if offer:
-        preview_content = preview_content.replace('{{property_title}}', offer.title or '[Property Title]')
-        preview_content = preview_content.replace('{{property_location}}', offer.location or '[Location]')
-        preview_content = preview_content.replace('{{property_price}}', _format_price(offer.price) if offer.price else '[Price]')
-        preview_content = preview_content.replace('{{property_area}}', str(offer.area) if offer.area else '[Area]')
-        preview_content = preview_content.replace('{{property_rooms}}', str(offer.number_of_rooms) if offer.number_of_rooms else '[Rooms]')
-        preview_content = preview_content.replace('{{property_floor}}', offer.floor or '[Floor]')
-        preview_content = preview_content.replace('{{property_description}}', offer.body or '[Description]')
-    else:
-        preview_content = preview_content.replace('{{property_title}}', '[Property Title]')
-        preview_content = preview_content.replace('{{property_location}}', '[Location]')
-        preview_content = preview_content.replace('{{property_price}}', '[Price]')
-        preview_content = preview_content.replace('{{property_area}}', '[Area]')
-        preview_content = preview_content.replace('{{property_rooms}}', '[Rooms]')
-        preview_content = preview_content.replace('{{property_floor}}', '[Floor]')
-        preview_content = preview_content.replace('{{property_description}}', '[Description]')
-    
-    return JsonResponse({
-        "success": True,
-        "preview_content": preview_content
-    })
+        preview_url += f"?offer_id={offer.id}"
+    return _preview_response(preview_content, etag, version=version, preview_url=preview_url)
+
+
+def _contract_preview_etag(request, version):
+    landlord = get_logged_in_landlord(request)
+    return preview_etag(version, landlord, _preview_offer(request, landlord))
+
+
+@require_http_methods(["GET"])
+@landlord_required
+@condition(etag_func=_contract_preview_etag)
+def contract_preview(request, version):
+    """Preview of a stored template version (304 when the client's copy is current)"""
+    landlord = get_logged_in_landlord(request)
+    try:
+        template = load_template(landlord.id, version)
+    except PreviewExpired:
+        return _preview_expired()
+    preview_content, etag = render_preview(template, landlord, _preview_offer(request, landlord))
+    return _preview_response(preview_content, etag, version=version)
 
 
 @require_http_methods(["POST"])
@@ -1349,213 +1358,24 @@ def preview_contract_pdf(request):
     """Download contract template preview as PDF - same layout as generated contract, landlord/property filled."""
     if not REPORTLAB_AVAILABLE:
         return JsonResponse({"error": "PDF export not available. Install reportlab: pip install reportlab"}, status=503)
-    from datetime import date
     landlord = get_logged_in_landlord(request)
-    template_content = request.POST.get("template_content", "")
-    template_structure_json = request.POST.get("template_structure", "")
-    offer_id = request.POST.get("offer_id", "")
-    template_structure = None
-    if template_structure_json:
-        try:
-            template_structure = json.loads(template_structure_json)
-        except (ValueError, TypeError):
-            pass
-    if not template_content and not template_structure:
+    try:
+        template = _preview_template(request, landlord)
+    except PreviewExpired:
+        return _preview_expired()
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if not template["content"] and not template["structure"]:
         return JsonResponse({"error": "No template content"}, status=400)
-    offer = None
-    if offer_id:
-        offer = Offer.objects.filter(id=offer_id, user=landlord).first()
-    preview_content = _build_preview_content_for_pdf(template_content, template_structure, landlord, offer)
-    pdf_font, pdf_font_bold = _register_pdf_fonts()
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=72)
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "CustomTitle", parent=styles["Heading1"], fontSize=18, textColor="#1a1a1a",
-        spaceAfter=30, alignment=TA_CENTER, fontName=pdf_font_bold
-    )
-    normal_style = ParagraphStyle(
-        "CustomNormal", parent=styles["Normal"], fontSize=11, textColor="#1a1a1a",
-        spaceAfter=12, leading=14, alignment=TA_JUSTIFY, fontName=pdf_font
-    )
-    elements = []
-    elements.append(Paragraph("Lease Agreement", title_style))
-    elements.append(Spacer(1, 0.3 * inch))
-    prop_title = offer.title if offer else "[Property Title]"
-    prop_location = (offer.location or "N/A") if offer else "[Location]"
-    landlord_name = f"{landlord.name or ''} {landlord.surname or ''}".strip() or "[Landlord]"
-    meta_info = f"""
-    <b>Property:</b> {prop_title}<br/>
-    <b>Location:</b> {prop_location}<br/>
-    <b>Landlord:</b> {landlord_name}<br/>
-    <b>Tenant:</b> [Tenant Name]<br/>
-    <b>Date Created:</b> {date.today().strftime('%B %d, %Y')}<br/>
-    """
-    elements.append(Paragraph(meta_info, normal_style))
-    elements.append(Spacer(1, 0.3 * inch))
-    elements.append(Spacer(1, 0.1 * inch))
-    elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
-    elements.append(Spacer(1, 0.2 * inch))
-    for para in preview_content.split("\n"):
-        para = para.strip()
-        if para:
-            para = " ".join(para.split())
-            para = para.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-            elements.append(Paragraph(para, normal_style))
-            elements.append(Spacer(1, 0.1 * inch))
-    elements.append(Spacer(1, 0.3 * inch))
-    elements.append(Paragraph("<b>────────────────────────────────────────────────────────────</b>", normal_style))
-    elements.append(Spacer(1, 0.2 * inch))
-    signature_info = """
-    <b>Signatures:</b><br/><br/>
-    <b>Tenant:</b> [ ] Pending<br/><br/>
-    <b>Landlord:</b> [ ] Pending
-    """
-    elements.append(Paragraph(signature_info, normal_style))
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="contract_template_preview.pdf"'
-    response["Content-Length"] = len(pdf)
-    return response
-
-
-def get_placeholder_value(field_name, offer, tenant, landlord):
-    """Get the actual value for a placeholder field"""
-    LABEL_TO_FIELD = {
-        'Email': 'landlord_email', 'Phone': 'landlord_phone', 'Bank Account': 'landlord_bank_account',
-        'Location': 'property_location', 'Area': 'property_area', 'Rooms': 'property_rooms',
-        'Floor': 'property_floor', 'Price': 'property_price', 'Description': 'property_description',
-        'Property Title': 'property_title', 'Tenant Name PESEL': None,
-    }
-    if field_name in LABEL_TO_FIELD:
-        mapped = LABEL_TO_FIELD[field_name]
-        if mapped:
-            field_name = mapped
-        elif field_name == 'Tenant Name PESEL':
-            return f"{tenant.name or ''} {tenant.surname or ''} {tenant.pesel or ''}".strip()
-    
-    if field_name == 'tenant_name':
-        return tenant.name or ''
-    elif field_name == 'tenant_surname':
-        return tenant.surname or ''
-    elif field_name == 'tenant_full_name':
-        return f"{tenant.name} {tenant.surname}" or ''
-    elif field_name == 'tenant_pesel':
-        return tenant.pesel or ''
-    elif field_name == 'tenant_id_card':
-        return tenant.id_card_number or ''
-    elif field_name == 'tenant_address':
-        return tenant.get_full_address() or ''
-    elif field_name == 'tenant_phone':
-        return tenant.phone_number or ''
-    elif field_name == 'tenant_email':
-        return tenant.email or ''
-    elif field_name == 'tenant_bank_account':
-        return tenant.bank_account_number or ''
-    
-    elif field_name == 'landlord_name':
-        return landlord.name or ''
-    elif field_name == 'landlord_surname':
-        return landlord.surname or ''
-    elif field_name == 'landlord_full_name':
-        return f"{landlord.name} {landlord.surname}" or ''
-    elif field_name == 'landlord_pesel':
-        return landlord.pesel or ''
-    elif field_name == 'landlord_id_card':
-        return landlord.id_card_number or ''
-    elif field_name == 'landlord_address':
-        return landlord.get_full_address() or ''
-    elif field_name == 'landlord_phone':
-        return landlord.phone_number or ''
-    elif field_name == 'landlord_email':
-        return landlord.email or ''
-    elif field_name == 'landlord_bank_account':
-        return landlord.bank_account_number or ''
-    
-    elif field_name == 'property_title':
-        return offer.title or ''
-    elif field_name == 'property_location':
-        return offer.location or ''
-    elif field_name == 'property_price':
-        return _format_price(offer.price)
-    elif field_name == 'property_area':
-        return str(offer.area) if offer.area else ''
-    elif field_name == 'property_rooms':
-        return str(offer.number_of_rooms) if offer.number_of_rooms else ''
-    elif field_name == 'property_floor':
-        return offer.floor or ''
-    elif field_name == 'property_description':
-        return offer.body or ''
-    
-    return ''
-
-
-def generate_contract_from_template(template, offer, tenant, landlord):
-    """Generate a contract instance from a template by replacing placeholders"""
-    if template.template_structure:
-        content_parts = []
-        for item in template.template_structure:
-            if item.get('type') == 'text':
-                content_parts.append(item.get('content', ''))
-            elif item.get('type') == 'block':
-                field_name = item.get('field_name', '')
-                value = get_placeholder_value(field_name, offer, tenant, landlord)
-                content_parts.append(value)
-        return ''.join(content_parts)
-    else:
-        content = template.template_content
-        
-        content = content.replace('{{tenant_name}}', tenant.name or '')
-        content = content.replace('{{tenant_surname}}', tenant.surname or '')
-        content = content.replace('{{tenant_full_name}}', f"{tenant.name} {tenant.surname}" or '')
-        content = content.replace('{{tenant_pesel}}', tenant.pesel or '')
-        content = content.replace('{{tenant_id_card}}', tenant.id_card_number or '')
-        content = content.replace('{{tenant_address}}', tenant.get_full_address() or '')
-        content = content.replace('{{tenant_phone}}', tenant.phone_number or '')
-        content = content.replace('{{tenant_email}}', tenant.email or '')
-        content = content.replace('{{tenant_bank_account}}', tenant.bank_account_number or '')
-        
-        content = content.replace('{{landlord_name}}', landlord.name or '')
-        content = content.replace('{{landlord_surname}}', landlord.surname or '')
-        content = content.replace('{{landlord_full_name}}', f"{landlord.name} {landlord.surname}" or '')
-        content = content.replace('{{landlord_pesel}}', landlord.pesel or '')
-        content = content.replace('{{landlord_id_card}}', landlord.id_card_number or '')
-        content = content.replace('{{landlord_address}}', landlord.get_full_address() or '')
-        content = content.replace('{{landlord_phone}}', landlord.phone_number or '')
-        content = content.replace('{{landlord_email}}', landlord.email or '')
-        content = content.replace('{{landlord_bank_account}}', landlord.bank_account_number or '')
-        
-        content = content.replace('{{property_title}}', offer.title or '')
-        content = content.replace('{{property_location}}', offer.location or '')
-        content = content.replace('{{property_price}}', _format_price(offer.price))
-        content = content.replace('{{property_area}}', str(offer.area) if offer.area else '')
-        content = content.replace('{{property_rooms}}', str(offer.number_of_rooms) if offer.number_of_rooms else '')
-        content = content.replace('{{property_floor}}', offer.floor or '')
-        content = content.replace('{{property_description}}', offer.body or '')
-        
-        content = content.replace('**Email**', landlord.email or '')
-        content = content.replace('**Phone**', landlord.phone_number or '')
-        content = content.replace('**Bank Account**', landlord.bank_account_number or '')
-        content = content.replace('{{Email}}', landlord.email or '')
-        content = content.replace('{{Phone}}', landlord.phone_number or '')
-        content = content.replace('{{Bank Account}}', landlord.bank_account_number or '')
-        tenant_name_pesel = f"{tenant.name or ''} {tenant.surname or ''} {tenant.pesel or ''}".strip()
-        content = content.replace('**Tenant Name PESEL**', tenant_name_pesel)
-        content = content.replace('{{Tenant Name PESEL}}', tenant_name_pesel)
-        content = content.replace('**Location**', offer.location or '')
-        content = content.replace('**Area**', str(offer.area) if offer.area else '')
-        content = content.replace('**Rooms**', str(offer.number_of_rooms) if offer.number_of_rooms else '')
-        content = content.replace('**Floor**', offer.floor or '')
-        content = content.replace('**Price**', _format_price(offer.price))
-        content = content.replace('{{Location}}', offer.location or '')
-        content = content.replace('{{Area}}', str(offer.area) if offer.area else '')
-        content = content.replace('{{Rooms}}', str(offer.number_of_rooms) if offer.number_of_rooms else '')
-        content = content.replace('{{Floor}}', offer.floor or '')
-        content = content.replace('{{Price}}', _format_price(offer.price))
-        
-        return content
+    offer = _preview_offer(request, landlord)
+    preview_content, _ = render_preview(template, landlord, offer)
+    inputs = preview_pdf_inputs(preview_content, landlord, offer)
+    key = contract_pdf_key(inputs)
+    job = request_pdf(None, inputs, key)
+    if job is not None and job.status != PdfRenderJob.DONE:
+        return _pdf_job_pending(request, job)
+    return FileResponse(open(cached_pdf_path(None, key), 'rb'), as_attachment=True,
+                        filename="contract_template_preview.pdf", content_type="application/pdf")
 
 
 @require_http_methods(["POST"])
@@ -1594,10 +1414,9 @@ def rent_finalize(request, conversation_id):
         offer.assigned_user = tenant
         offer.save()
         
-        Message.objects.create(
-            conversation=conversation,
-            sender_id=landlord.id,
+        conversation.add_message(
             sender_type='landlord',
+            sender_id=landlord.id,
             content=f"📄 A contract has been generated for {offer.title}. Please review and sign the contract in your Contracts section."
         )
         